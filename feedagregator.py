@@ -21,6 +21,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Launch script.
 """
+import argparse
 import os
 import sys
 from tkinter import Tk
@@ -31,8 +32,22 @@ import logging
 from feedagregatorlib.messagebox import showerror
 from feedagregatorlib.app import App
 from feedagregatorlib.constants import PIDFILE, save_config, save_feeds, APP_NAME, save_latests
+from feedagregatorlib.opml import export_opml
 
 
+# --- command line
+parser = argparse.ArgumentParser(description=_("RSS and Atom feed agregator in desktop widgets + notifications"))
+parser.add_argument('--export-opml', metavar='FILE',
+                    help=_("export the feeds to FILE in OPML format ('-' for the standard output) and exit"))
+args = parser.parse_args()
+
+if args.export_opml:
+    try:
+        export_opml(args.export_opml)
+    except OSError as e:
+        sys.exit(_("Failed to export the feeds to {file}.").format(file=args.export_opml) + ' ' + str(e))
+    sys.exit()
+
 # check whether feedagregator is running
 pid = str(os.getpid())
 
@@ -34,7 +34,7 @@ class Add(Toplevel):
         self.resizable(True, False)
         self.columnconfigure(1, weight=1)
 
-        Label(self, text=_('URL')).grid(row=0, column=0, sticky='e', pady=4, padx=4)
+        Label(self, text=_('Feed or website URL')).grid(row=0, column=0, sticky='e', pady=4, padx=4)
         self.url = ""
         self.url_entry = Entry(self, width=30)
         self.url_entry.grid(row=0, column=1, sticky='ew', pady=4, padx=4)
@@ -20,33 +20,41 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Main class
 """
+import atexit
 import configparser
+import os
+import shutil
+import tempfile
 import traceback
 import logging
-import os
-import pickle
+import time
 try:
     from subprocess import run
 except ImportError:
     from subprocess import call as run
-from multiprocessing import Process, Queue
-from datetime import datetime
+from collections import Counter
 from tkinter import Tk, TclError
+from tkinter.filedialog import askopenfilename
 from tkinter import PhotoImage as tkPhotoImage
 from tkinter.ttk import Style
 
-import feedparser
-import dateutil.parser
 from PIL.ImageTk import PhotoImage
 from PIL import Image
 
 import feedagregatorlib.constants as cst
-from feedagregatorlib.messagebox import showerror
+from feedagregatorlib.messagebox import showerror, showinfo
 from feedagregatorlib.trayicon import TrayIcon, SubMenu
 from feedagregatorlib.add import Add
+from feedagregatorlib.import_progress import ImportProgress
+from feedagregatorlib.opml import read_opml
 from feedagregatorlib.manager import Manager
 from feedagregatorlib.settings import Config
 from feedagregatorlib.widgets import CatWidget, FeedWidget
+from feedagregatorlib.fetcher import FeedFetcher
+from feedagregatorlib.connectivity import ConnectivityMonitor
+from feedagregatorlib.hosts import CircuitBreaker, HostLimiter, url_host
+from feedagregatorlib.scheduler import RefreshScheduler, adapt_interval, \
+    skip_forward, feed_offset, jitter, HINT_MAX_DELAY
 from feedagregatorlib.version_check import UpdateChecker
 from feedagregatorlib.about import About
 from feedagregatorlib.help import Help
@@ -56,6 +64,13 @@ CONFIG = cst.CONFIG
 FEEDS = cst.FEEDS
 LATESTS = cst.LATESTS
 
+# delay (ms) between the first update result of a cycle and the end of the
+# cycle, so that the feeds refreshed in the meantime are handled together
+END_UPDATE_DELAY = 60000
+# minimum delay (s) between two checks of the age limit of a feed without new
+# entries, the other retention limits are enforced when entries are added
+PRUNE_INTERVAL = 86400
+
 
 class App(Tk):
     def __init__(self):
@@ -197,10 +212,14 @@ class App(Tk):
 
         self.icon.menu.add_cascade(label=_('Widgets'), menu=self.menu_widgets)
         self.icon.menu.add_command(label=_('Add feed'), command=self.add)
+        self.icon.menu.add_command(label=_('Import feeds'), command=self.feed_import)
         self.icon.menu.add_command(label=_('Update feeds'), command=self.feed_update)
         self.icon.menu.add_command(label=_('Manage feeds'),
                                    command=self.feed_manage)
         self.icon.menu.add_command(label=_("Suspend"), command=self.start_stop)
+        # indices of the menu items changed when suspending the updates
+        self._menu_suspend = 5
+        self._menu_updates = [1, 2, 3]  # add, import and update feeds
         self.icon.menu.add_separator()
         self.icon.menu.add_command(label=_('Settings'), command=self.settings)
         self.icon.menu.add_command(label=_("Check for updates"),
@@ -211,15 +230,39 @@ class App(Tk):
         self.icon.loop(self)
 
         self._notify_no_internet = True
+        self._suspended = False     # updates suspended by the user
 
         self._internet_id = ""
         self._update_id = ""
-        self._check_add_id = ""
-        self._check_end_update_id = ""
-        self._check_result_update_id = {}
-        self._check_result_init_id = {}
-        self.queues = {}
-        self.threads = {}
+        self._updating = {}  # {title: job_id} feeds being updated in the current cycle
+        self._cycle_stats = Counter()
+        self._cycle_start = None    # start of the current update cycle
+        self._end_update_id = ""
+        self.scheduler = RefreshScheduler()
+        self.fetcher = FeedFetcher(self, CONFIG.getint("General", "fetch_workers", fallback=4),
+                                   CONFIG.getint("General", "connection_pool_size", fallback=2),
+                                   CONFIG.getint("General", "connection_idle_timeout", fallback=60),
+                                   CONFIG.getint("General", "connect_timeout", fallback=10),
+                                   CONFIG.getint("General", "read_timeout", fallback=30),
+                                   HostLimiter(**self._host_limits()),
+                                   self._fetch_backend(),
+                                   CONFIG.getint("General", "http_cache_size", fallback=50) * 1024 ** 2)
+        self.breaker = CircuitBreaker(CONFIG.getint("General", "breaker_threshold", fallback=3),
+                                      CONFIG.getint("General", "breaker_cooldown", fallback=300))
+        self.connectivity = ConnectivityMonitor(self, self._connectivity_changed,
+                                                CONFIG.get("General", "connectivity_host",
+                                                           fallback="www.google.com"),
+                                                CONFIG.getint("General", "connectivity_port",
+                                                              fallback=443))
+
+        # --- latest entry of each feed, shared by the category widgets
+        filenames = {title: FEEDS.get(title, 'data') for title in FEEDS.sections()
+                     if FEEDS.has_option(title, 'data')}
+        nb = cst.remove_unused_data(filenames.values())
+        if nb:
+            logging.info('Removed the data of %i feeds which are not in the feed list', nb)
+        latests = cst.feeds_get_latest(filenames.values())
+        self.latests = {title: latests.get(filename, '') for title, filename in filenames.items()}
 
         # --- category widgets
         self.cat_widgets = {}
@@ -245,10 +288,6 @@ class App(Tk):
         # --- feed widgets
         self.feed_widgets = {}
         for title in FEEDS.sections():
-            self._check_result_update_id[title] = ''
-            self._check_result_init_id[title] = ''
-            self.queues[title] = Queue(1)
-            self.threads[title] = None
             self.menu_feeds.add_checkbutton(label=title,
                                             command=lambda t=title: self.toggle_feed_widget(t))
             self.feed_widgets[title] = FeedWidget(self, title)
@@ -378,28 +417,32 @@ class App(Tk):
 
     def start_stop(self):
         """Suspend / restart update checks."""
-        if self.icon.menu.get_item_label(4) == _("Suspend"):
-            after_ids = [self._update_id, self._check_add_id, self._internet_id,
-                         self._check_end_update_id, self._update_id]
-            after_ids.extend(self._check_result_update_id.values())
-            after_ids.extend(self._check_result_init_id.values())
-            for after_id in after_ids:
+        if not self._suspended:
+            self._suspended = True
+            for after_id in [self._update_id, self._internet_id]:
                 try:
                     self.after_cancel(after_id)
                 except ValueError:
                     pass
-            self.icon.menu.set_item_label(4, _("Restart"))
-            self.icon.menu.disable_item(1)
-            self.icon.menu.disable_item(2)
+            # the feeds being added or imported are still fetched
+            self.fetcher.cancel(*self._updating.values())
+            self._updating.clear()
+            self.scheduler.clear()
+            self.icon.menu.set_item_label(self._menu_suspend, _("Restart"))
+            for index in self._menu_updates:
+                self.icon.menu.disable_item(index)
             self.icon.change_icon(cst.ICON_DISABLED, 'feedagregator suspended')
         else:
-            self.icon.menu.set_item_label(4, _("Suspend"))
-            self.icon.menu.enable_item(1)
-            self.icon.menu.enable_item(2)
+            self._suspended = False
+            self.icon.menu.set_item_label(self._menu_suspend, _("Suspend"))
+            for index in self._menu_updates:
+                self.icon.menu.enable_item(index)
             self.icon.change_icon(cst.ICON, 'feedagregator')
-            for widget in self.feed_widgets.values():
-                widget.clear()
             self.feed_init()
+            if not self._notify_no_internet:
+                # the probes were stopped with the updates, the feeds are
+                # refreshed once the connection is back
+                self.test_connection()
 
     @staticmethod
     def entry_select_all(event):
@@ -407,18 +450,26 @@ class App(Tk):
         event.widget.selection_range(0, 'end')
 
     def test_connection(self):
-        """
-        Launch update check if there is an internet connection otherwise
-        check again for an internet connection after 30s.
-        """
-        if cst.internet_on():
+        """Check the Internet connection in the background every 30s while offline."""
+        self.connectivity.probe()
+        self._internet_id = self.after(30000, self.test_connection)
+
+    def _connectivity_changed(self, online):
+        """Suspend updates when offline and resume them when back online."""
+        if not online:
+            self._no_internet()
+        elif not self._notify_no_internet:
             logging.info('Connected to Internet')
             self._notify_no_internet = True
-            for widget in self.feed_widgets.values():
-                widget.clear()
-            self.feed_init()
-        else:
-            self._internet_id = self.after(30000, self.test_connection)
+            # the servers could not be reached because of the connection
+            self.breaker.clear()
+            try:
+                self.after_cancel(self._internet_id)
+            except ValueError:
+                pass
+            self._internet_id = ""
+            if not self._suspended:
+                self.feed_init()
 
     def quit(self):
         for after_id in self.tk.call('after', 'info'):
@@ -426,11 +477,8 @@ class App(Tk):
                 self.after_cancel(after_id)
             except ValueError:
                 pass
-        for thread in self.threads.values():
-            try:
-                thread.terminate()
-            except AttributeError:
-                pass
+        self.fetcher.stop()
+        self.connectivity.close()
         for title, widget in self.feed_widgets.items():
             FEEDS.set(title, 'visible', str(widget.variable.get()))
         for cat, widget in self.cat_widgets.items():
@@ -490,13 +538,16 @@ class App(Tk):
         showerror(_("Error"), str(args[1]), err, True)
 
     def settings(self):
-        update_delay = CONFIG.get('General', 'update_delay')
+        update_delays = [CONFIG.get('General', key, fallback='')
+                         for key in ['update_delay', 'min_update_delay', 'max_update_delay']]
+        fetch_workers = CONFIG.getint('General', 'fetch_workers', fallback=4)
+        retention = cst.feed_retention()
         splash_supp = CONFIG.get('General', 'splash_supported', fallback=True)
         dialog = Config(self)
         self.wait_window(dialog)
         cst.save_config()
         self.widget_style_init()
-        splash_change = splash_supp != CONFIG.get('General', 'splash_supported')
+        splash_change = splash_supp != CONFIG.get('General', 'splash_supported', fallback=True)
         for widget in self.cat_widgets.values():
             widget.update_style()
             if splash_change:
@@ -505,8 +556,25 @@ class App(Tk):
             widget.update_style()
             if splash_change:
                 widget.update_position()
-        if update_delay != CONFIG.get('General', 'update_delay'):
-            self.feed_update()
+        if fetch_workers != CONFIG.getint('General', 'fetch_workers', fallback=4):
+            self.fetcher.resize(CONFIG.getint('General', 'fetch_workers', fallback=4))
+        connection = dict(pool_size=CONFIG.getint('General', 'connection_pool_size', fallback=2),
+                          idle_timeout=CONFIG.getint('General', 'connection_idle_timeout', fallback=60),
+                          connect_timeout=CONFIG.getint('General', 'connect_timeout', fallback=10),
+                          read_timeout=CONFIG.getint('General', 'read_timeout', fallback=30),
+                          cache_size=CONFIG.getint('General', 'http_cache_size', fallback=50) * 1024 ** 2)
+        connection.update(self._host_limits())
+        self.fetcher.configure(**connection)
+        self.connectivity.host = CONFIG.get('General', 'connectivity_host', fallback='www.google.com')
+        if retention != cst.feed_retention():
+            self._feeds_prune()
+        if update_delays != [CONFIG.get('General', key, fallback='')
+                             for key in ['update_delay', 'min_update_delay', 'max_update_delay']]:
+            # restart the adaptation of the refresh intervals
+            for title in FEEDS.sections():
+                FEEDS.remove_option(title, 'update_interval')
+            self._feed_stagger([title for title in FEEDS.sections()
+                                if FEEDS.getboolean(title, 'active', fallback=True)])
 
     def add(self):
         dialog = Add(self)
@@ -522,122 +590,106 @@ class App(Tk):
         cst.save_feeds()
         cst.save_latests()
 
-    @staticmethod
-    def feed_get_info(url, queue, mode='latest'):
-        feed = feedparser.parse(url)
-        feed_title = feed['feed'].get('title', '')
-        entries = feed['entries']
-        today = datetime.now().strftime('%Y-%m-%d %H:%M')
-        if entries:
-            entry_title = entries[0].get('title', '')
-            summary = entries[0].get('summary', '')
-            link = entries[0].get('link', '')
-            latest = """<p id=title>{}</p>\n{}""".format(entry_title, summary)
-            if 'updated' in entries[0]:
-                updated = entries[0].get('updated')
-            else:
-                updated = entries[0].get('published', today)
-            updated = dateutil.parser.parse(updated, tzinfos=cst.TZINFOS).strftime('%Y-%m-%d %H:%M')
-        else:
-            entry_title = ""
-            summary = ""
-            link = ""
-            latest = ""
-            updated = today
-
-        if mode == 'all':
-            data = []
-            for entry in entries:
-                title = entry.get('title', '')
-                summary = entry.get('summary', '')
-                if 'updated' in entry:
-                    date = entry.get('updated')
+    def _feed_new(self, info, url, category='', visible=True, active=True):
+        """Create the config section of the feed fetched from url, return its name."""
+        title = info['title']
+        try:
+            # check if feed's title already exists
+            FEEDS.add_section(title)
+        except configparser.DuplicateSectionError:
+            i = 2
+            duplicate = True
+            while duplicate:
+                # increment i until title~#i does not already exist
+                try:
+                    FEEDS.add_section("{}~#{}".format(title, i))
+                except configparser.DuplicateSectionError:
+                    i += 1
                 else:
-                    date = entry.get('published', today)
-                date = dateutil.parser.parse(date, tzinfos=cst.TZINFOS).strftime('%Y-%m-%d %H:%M')
-                link = entry.get('link', '')
-                data.append((title, date, summary, link))
-            queue.put((feed_title, latest, updated, data))
+                    duplicate = False
+                    name = "{}~#{}".format(title, i)
         else:
-            queue.put((feed_title, latest, updated, entry_title, summary, link))
+            name = title
+        FEEDS.set(name, 'url', url)
+        FEEDS.set(name, 'updated', '%i' % info['updated'])
+        FEEDS.set(name, 'data', info['filename'])
+        FEEDS.set(name, 'visible', str(visible))
+        FEEDS.set(name, 'geometry', '')
+        FEEDS.set(name, 'position', 'normal')
+        FEEDS.set(name, 'category', category)
+        FEEDS.set(name, 'sort_is_reversed', 'False')
+        FEEDS.set(name, 'active', str(active))
+        self._feed_set_validators(name, info)
+        self.latests[name] = info['latest']
+        return name
+
+    def _feed_widget_create(self, name):
+        """Create the widget of the feed and its entry in the feed menu."""
+        self.feed_widgets[name] = FeedWidget(self, name)
+        self.menu_feeds.add_checkbutton(label=name,
+                                        command=lambda: self.toggle_feed_widget(name))
+        self.menu_feeds.set_item_value(name, self.feed_widgets[name].variable.get())
+        cst.add_trace(self.feed_widgets[name].variable, 'write',
+                      lambda *args: self.feed_widget_trace(name))
 
-    def _check_result_add(self, thread, queue, url, manager_queue=None):
-        if thread.is_alive():
-            self._check_add_id = self.after(1000, self._check_result_add,
-                                            thread, queue, url, manager_queue)
+    def _check_result_add(self, info, url, callback=None):
+        title = info.get('title', '') if info else ''
+        if title and 'url' in info:
+            # url is a web page advertising the feed
+            logging.info('Feed %s discovered from %s', info['url'], url)
+            url = info['url']
+            if url in [FEEDS.get(t, 'url') for t in FEEDS.sections()]:
+                cst.remove_data(info['filename'])
+                if callback is not None:
+                    callback('')
+                showinfo(_('Information'), _('The feed {url} is already in the list.').format(url=url))
+                return
+        if title:
+            latest = info['latest']
+            name = self._feed_new(info, url)
+            if callback is not None:
+                callback(name)
+            logging.info("Added feed '%s' %s", name, url)
+            if CONFIG.getboolean("General", "notifications", fallback=True):
+                run(["notify-send", "-i", cst.IM_ICON_SVG, name,
+                     cst.html2text(latest)])
+            self.cat_widgets['All'].entry_add(name, info['updated'], latest, url)
+            cst.save_feeds()
+            self._feed_widget_create(name)
+            self._feed_stagger([name])
         else:
-            title, latest, date, data = queue.get(False)
-            if title:
-                try:
-                    # check if feed's title already exists
-                    FEEDS.add_section(title)
-                except configparser.DuplicateSectionError:
-                    i = 2
-                    duplicate = True
-                    while duplicate:
-                        # increment i until title~#i does not already exist
-                        try:
-                            FEEDS.add_section("{}~#{}".format(title, i))
-                        except configparser.DuplicateSectionError:
-                            i += 1
-                        else:
-                            duplicate = False
-                            name = "{}~#{}".format(title, i)
-                else:
-                    name = title
-                if manager_queue is not None:
-                    manager_queue.put(name)
-                logging.info("Added feed '%s' %s", name, url)
-                if CONFIG.getboolean("General", "notifications", fallback=True):
-                    run(["notify-send", "-i", cst.IM_ICON_SVG, name,
-                         cst.html2text(latest)])
-                self.cat_widgets['All'].entry_add(name, date, latest, url)
-                filename = cst.new_data_file()
-                cst.save_data(filename, latest, data)
-                FEEDS.set(name, 'url', url)
-                FEEDS.set(name, 'updated', date)
-                FEEDS.set(name, 'data', filename)
-                FEEDS.set(name, 'visible', 'True')
-                FEEDS.set(name, 'geometry', '')
-                FEEDS.set(name, 'position', 'normal')
-                FEEDS.set(name, 'category', '')
-                FEEDS.set(name, 'sort_is_reversed', 'False')
-                FEEDS.set(name, 'active', 'True')
-                cst.save_feeds()
-                self.queues[name] = queue
-                self.feed_widgets[name] = FeedWidget(self, name)
-                self.menu_feeds.add_checkbutton(label=name,
-                                                command=lambda: self.toggle_feed_widget(name))
-                cst.add_trace(self.feed_widgets[name].variable, 'write',
-                              lambda *args: self.feed_widget_trace(name))
-                self.feed_widgets[name].variable.set(True)
-                for entry_title, date, summary, link in data:
-                    self.feed_widgets[name].entry_add(entry_title, date, summary, link, -1)
+            if callback is not None:
+                callback('')
+            if info is not None and info.get('error') == 'timeout':
+                logging.warning('Fetching %s timed out.', url)
+                showerror(_('Error'), _('Fetching {url} timed out.').format(url=url))
+            elif info is not None and info['status'] is None and not self.connectivity.online:
+                logging.warning('No Internet connection.')
+                showerror(_('Error'), _('No Internet connection.'))
             else:
-                if manager_queue is not None:
-                    manager_queue.put('')
-                if cst.internet_on():
+                if info is not None and info['status'] is None:
+                    # make sure the connection is still up
+                    self.connectivity.probe()
+                if info is not None and 'candidates' in info:
+                    logging.error('No valid feed found in %s.', url)
+                    showerror(_('Error'), _('No valid feed was found in the page {url}.').format(url=url))
+                else:
                     logging.error('%s is not a valid feed.', url)
                     showerror(_('Error'), _('{url} is not a valid feed.').format(url=url))
-                else:
-                    logging.warning('No Internet connection.')
-                    showerror(_('Error'), _('No Internet connection.'))
 
-    def feed_add(self, url, manager=False):
+    def feed_add(self, url, callback=None):
         """
         Add feed with given url.
 
-        manager: whether this command is run from the feed manager.
+        url can also be the url of a web page advertising the feed.
+
+        callback: function called with the name of the added feed
+                  ('' if the feed could not be added), e.g. to update the
+                  feed manager.
         """
         if url:
-            queue = Queue(1)
-            manager_queue = Queue(1) if manager else None
-            thread = Process(target=self.feed_get_info, args=(url, queue, 'all'),
-                             daemon=True)
-            thread.start()
-            self._check_result_add(thread, queue, url, manager_queue)
-            if manager:
-                return manager_queue
+            self.fetcher.submit(url, lambda info: self._check_result_add(info, url, callback),
+                                filename='', discover=True, retention=cst.feed_retention())
 
     def feed_set_active(self, title, active):
         FEEDS.set(title, 'active', str(active))
@@ -653,6 +705,7 @@ class App(Tk):
             self._feed_update(title)
         else:
             self.menu_feeds.disable_item(title)
+            self.scheduler.remove(title)
             self.feed_widgets[title].withdraw()
             if cat != '':
                 self.cat_widgets[cat].hide_feed(title)
@@ -665,31 +718,168 @@ class App(Tk):
                 self.cat_widgets[old_cat].remove_feed(title)
             if new_cat != '':
                 if new_cat not in LATESTS.sections():
-                    LATESTS.add_section(new_cat)
-                    LATESTS.set(new_cat, 'visible', 'True')
-                    LATESTS.set(new_cat, 'geometry', '')
-                    LATESTS.set(new_cat, 'position', 'normal')
-                    LATESTS.set(new_cat, 'sort_order', 'A-Z')
-                    self.cat_widgets[new_cat] = CatWidget(self, new_cat)
-                    self.cat_widgets[new_cat].event_generate('<Configure>')
-                    self.menu_categories.add_checkbutton(label=new_cat,
-                                                         command=lambda: self.toggle_category_widget(new_cat))
-                    cst.add_trace(self.cat_widgets[new_cat].variable, 'write',
-                                  lambda *args: self.cat_widget_trace(new_cat))
-                    self.cat_widgets[new_cat].variable.set(True)
+                    self._category_new(new_cat)
+                    self._category_widget_create(new_cat)
                 else:
-                    try:
-                        filename = FEEDS.get(title, 'data')
-                        latest = cst.feed_get_latest(filename)
-                    except (configparser.NoOptionError, pickle.UnpicklingError):
-                        latest = ''
                     self.cat_widgets[new_cat].entry_add(title,
                                                         FEEDS.get(title, 'updated'),
-                                                        latest,
+                                                        self.latests.get(title, ''),
                                                         FEEDS.get(title, 'url'))
 
+    @staticmethod
+    def _category_new(category):
+        """Create the config section of the category."""
+        LATESTS.add_section(category)
+        LATESTS.set(category, 'visible', 'True')
+        LATESTS.set(category, 'geometry', '')
+        LATESTS.set(category, 'position', 'normal')
+        LATESTS.set(category, 'sort_order', 'A-Z')
+
+    def _category_widget_create(self, category):
+        """Create the widget of the category, it displays the feeds already in the category."""
+        self.cat_widgets[category] = CatWidget(self, category)
+        self.cat_widgets[category].event_generate('<Configure>')
+        self.menu_categories.add_checkbutton(label=category,
+                                             command=lambda: self.toggle_category_widget(category))
+        cst.add_trace(self.cat_widgets[category].variable, 'write',
+                      lambda *args: self.cat_widget_trace(category))
+        self.cat_widgets[category].variable.set(True)
+
+    def feed_import(self, filename=None, callback=None):
+        """
+        Import the feeds of an OPML file.
+
+        The feeds are fetched in parallel by the fetcher, then the feeds
+        and their widgets are created at once.
+
+        filename: OPML file, if None, ask the user
+        callback: function called with the list of the names of the
+                  imported feeds (empty if the import failed or was
+                  aborted), e.g. to update the feed manager.
+
+        Cancelling the import discards all the fetched feeds.
+        """
+        if filename is None:
+            filename = askopenfilename(title=_('Import Feeds'),
+                                       filetypes=[(_('OPML files'), '*.opml *.xml'),
+                                                  (_('All files'), '*')])
+        feeds = []
+        if filename:
+            try:
+                feeds = read_opml(filename)
+            except (ValueError, OSError) as e:
+                logging.error('Failed to read %s: %s', filename, e)
+                showerror(_('Error'), _('{file} is not a valid OPML file.').format(file=filename))
+                filename = ''
+        urls = {FEEDS.get(title, 'url') for title in FEEDS.sections()}
+        feeds = [feed for feed in feeds if feed[1] not in urls]
+        if not feeds:
+            if filename:
+                showinfo(_('Information'), _('There is no new feed to import.'))
+            if callback is not None:
+                callback([])
+            return
+        logging.info('Importing %i feeds from %s', len(feeds), filename)
+
+        results = []    # [(url, category, active, info)]
+        job_ids = []
+
+        def fetched(url, category, active, info):
+            results.append((url, category, active, info))
+            progress.step(not (info and info.get('title')))
+            if len(results) == len(feeds):
+                finish()
+
+        def finish():
+            progress.destroy()
+            names = self._feed_import_batch(results)
+            if callback is not None:
+                callback(names)
+
+        def cancel():
+            # the data saved by the running jobs is removed by the fetcher
+            self.fetcher.cancel(*job_ids)
+            progress.destroy()
+            for url, category, active, info in results:
+                if info and info.get('filename'):
+                    cst.remove_data(info['filename'])
+            logging.info('Import from %s cancelled', filename)
+            if callback is not None:
+                callback([])
+
+        progress = ImportProgress(self, len(feeds), cancel)
+        retention = cst.feed_retention()
+        for title, url, category, active in feeds:
+            job_ids.append(self.fetcher.submit(url,
+                                               lambda info, u=url, c=category, a=active:
+                                                   fetched(u, c, a, info),
+                                               filename='', discover=True,
+                                               retention=retention))
+
+    def _feed_import_batch(self, results):
+        """
+        Create the imported feeds and their widgets from the fetch results.
+
+        results: list of (url, category, active, info)
+
+        The config is saved once at the end. Return the names of the
+        imported feeds.
+        """
+        names = []
+        errors = []
+        new_cats = []
+        urls = {FEEDS.get(title, 'url') for title in FEEDS.sections()}
+        for url, category, active, info in results:
+            if not (info and info.get('title')):
+                errors.append(url)
+                continue
+            feed_url = info.get('url', url)
+            if feed_url in urls:
+                # the feed was discovered from a web page
+                logging.info('Skipping %s: the feed %s is already in the list', url, feed_url)
+                cst.remove_data(info['filename'])
+                continue
+            urls.add(feed_url)
+            # imported feeds are only displayed in the category widgets
+            names.append(self._feed_new(info, feed_url, category,
+                                        visible=False, active=active))
+            if category and category not in LATESTS.sections():
+                self._category_new(category)
+                new_cats.append(category)
+        cst.save_feeds()
+        cst.save_latests()
+        for name in names:
+            self._feed_widget_create(name)
+            latest = self.latests[name]
+            date = FEEDS.get(name, 'updated')
+            url = FEEDS.get(name, 'url')
+            self.cat_widgets['All'].entry_add(name, date, latest, url)
+            category = FEEDS.get(name, 'category')
+            if category and category not in new_cats:
+                self.cat_widgets[category].entry_add(name, date, latest, url)
+        for category in new_cats:
+            self._category_widget_create(category)
+        inactive = [name for name in names if not FEEDS.getboolean(name, 'active')]
+        for name in inactive:
+            self.menu_feeds.disable_item(name)
+            for widget in self.cat_widgets.values():
+                if name in widget.entries:
+                    widget.hide_feed(name)
+        for widget in self.cat_widgets.values():
+            widget.sort()
+        self._feed_stagger([name for name in names if name not in inactive])
+        logging.info('Imported %i feeds, %i errors', len(names), len(errors))
+        if CONFIG.getboolean("General", "notifications", fallback=True):
+            run(["notify-send", "-i", cst.IM_ICON_SVG, _('Import Feeds'),
+                 _('{nb} feeds imported').format(nb=len(names))])
+        if errors:
+            showerror(_('Error'),
+                      _('The following feeds could not be imported:\n{urls}').format(
+                          urls='\n'.join(errors[:20] + (['...'] if len(errors) > 20 else []))))
+        return names
+
     def feed_rename(self, old_name, new_name):
-        options = {opt: FEEDS.get(old_name, opt) for opt in FEEDS.options(old_name)}
+        options = {opt: FEEDS.get(old_name, opt, raw=True) for opt in FEEDS.options(old_name)}
         FEEDS.remove_section(old_name)
         try:
             # check if feed's title already exists
@@ -711,10 +901,12 @@ class App(Tk):
         logging.info("Renamed feed '%s' to '%s'", old_name, name)
         for opt, val in options.items():
             FEEDS.set(name, opt, val)
-        self._check_result_init_id[name] = self._check_result_init_id.pop(old_name, '')
-        self._check_result_update_id[name] = self._check_result_update_id.pop(old_name, '')
-        self.threads[name] = self.threads.pop(old_name, None)
-        self.queues[name] = self.queues.pop(old_name)
+        self.scheduler.rename(old_name, name)
+        self.latests[name] = self.latests.pop(old_name, '')
+        if old_name in self._updating:
+            # restart update under the new name
+            self.fetcher.cancel(self._updating.pop(old_name))
+            self._feed_update(name)
         self.feed_widgets[name] = self.feed_widgets.pop(old_name)
         self.feed_widgets[name].rename_feed(name)
         self.cat_widgets['All'].rename_feed(old_name, name)
@@ -736,25 +928,14 @@ class App(Tk):
         return name
 
     def feed_remove(self, title):
+        self.scheduler.remove(title)
+        if title in self._updating:
+            self.fetcher.cancel(self._updating.pop(title))
+        self.latests.pop(title, None)
         self.feed_widgets[title].destroy()
-        del self.queues[title]
-        try:
-            del self.threads[title]
-        except KeyError:
-            pass
         del self.feed_widgets[title]
-        try:
-            del self._check_result_init_id[title]
-        except KeyError:
-            pass
-        try:
-            del self._check_result_update_id[title]
-        except KeyError:
-            pass
-        try:
-            os.remove(os.path.join(cst.PATH_DATA, FEEDS.get(title, 'data')))
-        except FileNotFoundError:
-            pass
+        if FEEDS.has_option(title, 'data'):
+            cst.remove_data(FEEDS.get(title, 'data'))
         self.menu_feeds.delete(title)
         logging.info("Removed feed '%s' %s", title, FEEDS.get(title, 'url'))
         category = FEEDS.get(title, 'category', fallback='')
@@ -769,171 +950,370 @@ class App(Tk):
         self.update_idletasks()
         cst.save_latests()
         if dialog.change_made:
+            # the reactivated feeds are refreshed by feed_set_active and the
+            # new ones are scheduled when they are added
             cst.save_feeds()
-            self.feed_update()
+
+    @staticmethod
+    def _feed_set_validators(title, info):
+        """Store the HTTP validators from the fetch result info."""
+        for key in ['etag', 'modified']:
+            # escape % for configparser interpolation
+            FEEDS.set(title, key, info.get(key, '').replace('%', '%%'))
 
     def feed_init(self):
         """Update feeds."""
-        for title in FEEDS.sections():
-            if FEEDS.getboolean(title, 'active', fallback=True):
-                logging.info("Updating feed '%s'", title)
-                self.threads[title] = Process(target=self.feed_get_info,
-                                              args=(FEEDS.get(title, 'url'),
-                                                    self.queues[title], 'all'),
-                                              daemon=True)
-                self.threads[title].start()
-                self._check_result_init(title)
-        self._check_end_update_id = self.after(2000, self._check_end_update)
-
-    def _check_result_init(self, title):
-        if self.threads[title].is_alive():
-            self._check_result_init_id[title] = self.after(1000,
-                                                           self._check_result_init,
-                                                           title)
-        else:
-            t, latest, updated, data = self.queues[title].get()
-            if not t:
-                if cst.internet_on():
-                    run(["notify-send", "-i", "dialog-error", _("Error"),
-                         _('{url} is not a valid feed.').format(url=FEEDS.get(title, 'url'))])
-                    logging.error('%s is not a valid feed.', FEEDS.get(title, 'url'))
-                else:
-                    if self._notify_no_internet:
-                        run(["notify-send", "-i", "dialog-error", _("Error"),
-                             _('No Internet connection.')])
-                        logging.warning('No Internet connection')
-                        self._notify_no_internet = False
-                        self._internet_id = self.after(30000, self.test_connection)
-                    after_ids = [self._update_id, self._check_add_id,
-                                 self._check_end_update_id, self._update_id]
-                    after_ids.extend(self._check_result_update_id.values())
-                    after_ids.extend(self._check_result_init_id.values())
-                    for after_id in after_ids:
-                        try:
-                            self.after_cancel(after_id)
-                        except ValueError:
-                            pass
+        self._cycle_stats.clear()
+        self.scheduler.clear()
+        self._feed_stagger([title for title in FEEDS.sections()
+                            if FEEDS.getboolean(title, 'active', fallback=True)])
+        self._check_end_update()
+
+    def _feed_stagger(self, titles):
+        """
+        Schedule the refresh of the feeds, spread over the minimum update delay.
+
+        Each feed gets a deterministic offset within the delay so that the
+        refreshes do not all happen at the same time, the feeds then keep
+        their relative phase since their next refresh is scheduled from the
+        end of the previous one.
+        """
+        window = CONFIG.getint('General', 'min_update_delay', fallback=600000) / 1000
+        now = time.time()
+        for title in titles:
+            self.scheduler.schedule(title, now + feed_offset(FEEDS.get(title, 'url')) * window)
+        self._schedule_next_update()
+
+    def _feed_fetched(self, title, info):
+        """Handle the result of a fetch job from the current update cycle."""
+        new_entries = False
+        if info is not None and info['status'] is not None:
+            # the server answered
+            self.connectivity.report(True)
+        if info is not None and FEEDS.has_section(title):
+            self._feed_host_status(FEEDS.get(title, 'url'), info)
+        try:
+            if not FEEDS.has_section(title):
+                logging.info("Feed '%s' was renamed or removed during its update", title)
+                filename = info.get('filename') if info else None
+                if filename and filename not in [FEEDS.get(t, 'data', fallback='')
+                                                 for t in FEEDS.sections()]:
+                    # the feed was removed, discard the data saved by the worker
+                    cst.remove_data(filename)
+            elif info is not None and info['status'] == 304:
+                self._cycle_stats['not modified'] += 1
+                logging.info("Feed '%s' is not modified", title)
+                if 'pruned' in info:
+                    FEEDS.set(title, 'pruned', '%i' % time.time())
+                    self._feed_entries_pruned(title, info['pruned'])
+                if self.fetcher.interrupted(FEEDS.get(title, 'data', fallback='')):
+                    new_entries = self._feed_entries_sync(title) > 0
             else:
-                date = datetime.strptime(updated, '%Y-%m-%d %H:%M')
-                if (date > datetime.strptime(FEEDS.get(title, 'updated'), '%Y-%m-%d %H:%M')
-                   or not FEEDS.has_option(title, 'data')):
-                    if CONFIG.getboolean("General", "notifications", fallback=True):
-                        run(["notify-send", "-i", cst.IM_ICON_SVG, title,
-                             cst.html2text(latest)])
-                    FEEDS.set(title, 'updated', updated)
-                    category = FEEDS.get(title, 'category', fallback='')
-                    self.cat_widgets['All'].update_display(title, latest, updated)
-                    if category != '':
-                        self.cat_widgets[category].update_display(title, latest, updated)
-                    logging.info("Updated feed '%s'", title)
-                    self.feed_widgets[title].clear()
-                    for entry_title, date, summary, link in data:
-                        self.feed_widgets[title].entry_add(entry_title, date, summary, link, -1)
-                    logging.info("Populated widget for feed '%s'", title)
-                    self.feed_widgets[title].event_generate('<Configure>')
-                    self.feed_widgets[title].sort_by_date()
-                    try:
-                        filename = FEEDS.get(title, 'data')
-                    except configparser.NoOptionError:
-                        filename = cst.new_data_file()
-                        FEEDS.set(title, 'data', filename)
-                        cst.save_feeds()
-                    cst.save_data(filename, latest, data)
-                else:
-                    logging.info("Feed '%s' is up-to-date", title)
+                new_entries = self._check_result_update(title, info)
+        finally:
+            if title in self._updating:
+                del self._updating[title]
+                if FEEDS.has_section(title) and FEEDS.getboolean(title, 'active', fallback=True):
+                    self._feed_schedule(title, info, new_entries)
+                self._check_end_update()
 
-    def _feed_update(self, title):
-        """Update feed with given title."""
-        logging.info("Updating feed '%s'", title)
-        self.threads[title] = Process(target=self.feed_get_info,
-                                      args=(FEEDS.get(title, 'url'),
-                                            self.queues[title]),
-                                      daemon=True)
-        self.threads[title].start()
-        self._check_result_update(title)
+    @staticmethod
+    def _host_limits():
+        """
+        Return the HostLimiter options from the config.
 
-    def feed_update(self):
-        """Update all feeds."""
+        The limits of specific hosts can be set in the optional [Hosts]
+        section of the config file: host = max_connections spacing
+        """
+        max_connections = CONFIG.getint("General", "host_max_connections", fallback=2)
+        spacing = CONFIG.getfloat("General", "host_min_spacing", fallback=1)
+        overrides = {}
+        if CONFIG.has_section("Hosts"):
+            for host, value in CONFIG.items("Hosts"):
+                try:
+                    limits = value.split()
+                    overrides[host] = (int(limits[0]),
+                                       float(limits[1]) if len(limits) > 1 else spacing)
+                except (ValueError, IndexError):
+                    logging.warning('Invalid limits for host %s: %r', host, value)
+        return dict(max_connections=max_connections, spacing=spacing, overrides=overrides)
+
+    @staticmethod
+    def _fetch_backend():
+        """
+        Return the record / replay backend options from the config (None to use the network).
+
+        The backend is set in the optional [Backend] section of the config file:
+
+            mode: 'record' or 'replay'
+            directory: fixture directory (default: fixtures in the local directory)
+            latency, jitter, failure_rate, timeout_rate, status, status_rate,
+            conditional, seed: replay options (see replay.ReplayBackend)
+        """
+        if not CONFIG.has_section("Backend"):
+            return None
+        options = {'mode': CONFIG.get("Backend", "mode", fallback="replay"),
+                   'directory': CONFIG.get("Backend", "directory",
+                                           fallback=os.path.join(cst.LOCAL_PATH, "fixtures"))}
+        if options['mode'] == 'replay':
+            # count the requests of this run in all the workers
+            options['counters'] = tempfile.mkdtemp(prefix='feedagregator-replay-')
+            atexit.register(shutil.rmtree, options['counters'], True)
+            latency = CONFIG.get("Backend", "latency", fallback="0")
+            options['latency'] = latency if latency == 'recorded' else float(latency)
+            for key in ['jitter', 'failure_rate', 'timeout_rate', 'status_rate']:
+                if CONFIG.has_option("Backend", key):
+                    options[key] = CONFIG.getfloat("Backend", key)
+            for key in ['status', 'seed']:
+                if CONFIG.has_option("Backend", key):
+                    options[key] = CONFIG.getint("Backend", key)
+            options['conditional'] = CONFIG.getboolean("Backend", "conditional", fallback=True)
+        logging.info('Using %s fetch backend with fixtures in %s',
+                     options['mode'], options['directory'])
+        return options
+
+    def _feed_host_status(self, url, info):
+        """Update the circuit breaker of the feed's server from the fetch result info."""
+        host = url_host(url)
+        if info['status'] is None or info['status'] >= 500 or info['status'] == 429:
+            was_open = self.breaker.state(host) == self.breaker.OPEN
+            self.breaker.failure(host)
+            if not was_open and self.breaker.state(host) == self.breaker.OPEN:
+                logging.warning("Server %s is failing, suspending its feeds until %s", host,
+                                time.strftime('%H:%M', time.localtime(self.breaker.retry_time(host))))
+        else:
+            recovered = self.breaker.state(host) != self.breaker.CLOSED
+            self.breaker.success(host)
+            if recovered:
+                logging.info("Server %s is back, resuming its feeds", host)
+                self._feed_stagger([title for title in FEEDS.sections()
+                                    if FEEDS.getboolean(title, 'active', fallback=True)
+                                    and url_host(FEEDS.get(title, 'url')) == host
+                                    and title not in self._updating])
+
+    def _feed_schedule(self, title, info, new_entries):
+        """Schedule next refresh of feed, adapting its interval to its publishing rate."""
+        update_delay = CONFIG.getint('General', 'update_delay')
+        min_delay = CONFIG.getint('General', 'min_update_delay', fallback=600000)
+        max_delay = CONFIG.getint('General', 'max_update_delay', fallback=86400000)
+        interval = FEEDS.getint(title, 'update_interval', fallback=update_delay)
+        period = info.get('period') if info else None
+        interval = adapt_interval(interval, period * 1000 if period else None,
+                                  new_entries, min_delay, max(min_delay, max_delay))
+        FEEDS.set(title, 'update_interval', '%i' % interval)
+        # honor refresh hints from the feed and the server
+        hints = info.get('hints', {}) if info else {}
+        if 'feed_delay' in hints:
+            FEEDS.set(title, 'feed_delay', '%i' % hints['feed_delay'])
+            FEEDS.set(title, 'skip_hours', ' '.join(str(h) for h in hints['skip_hours']))
+            FEEDS.set(title, 'skip_days', ' '.join(str(d) for d in hints['skip_days']))
+        hint_delay = max(FEEDS.getint(title, 'feed_delay', fallback=0),
+                         hints.get('http_delay', 0))
+        # randomize the delay so that feeds sharing the same interval drift apart
+        ratio = CONFIG.getint('General', 'update_jitter', fallback=10) / 100
+        delay = max(jitter(interval / 1000, ratio), min(hint_delay, HINT_MAX_DELAY))
+        skip_hours = [int(h) for h in FEEDS.get(title, 'skip_hours', fallback='').split()]
+        skip_days = [int(d) for d in FEEDS.get(title, 'skip_days', fallback='').split()]
+        self.scheduler.schedule(title, skip_forward(time.time() + delay, skip_hours, skip_days))
+        self._schedule_next_update()
+
+    def _schedule_next_update(self):
+        """Arm the update timer for the next feed to refresh, unless the updates are suspended."""
         try:
             self.after_cancel(self._update_id)
         except ValueError:
             pass
-        for thread in self.threads.values():
-            try:
-                thread.terminate()
-            except AttributeError:
-                pass
-        self.threads.clear()
+        due = self.scheduler.next_due()
+        if due is None or self._suspended or not self._notify_no_internet:
+            # feed_init reschedules the feeds when the updates resume
+            self._update_id = ""
+        else:
+            self._update_id = self.after(max(0, int((due - time.time()) * 1000)),
+                                         self._feed_update_due)
+
+    def _feed_update_due(self):
+        """Update the feeds whose refresh is due."""
+        self._update_id = ""
+        for title in self.scheduler.pop_due(time.time()):
+            self._feed_update(title)
+        self._schedule_next_update()
+
+    def _no_internet(self):
+        """Notify about the lack of Internet connection and suspend updates."""
+        if self._notify_no_internet:
+            run(["notify-send", "-i", "dialog-error", _("Error"),
+                 _('No Internet connection.')])
+            logging.warning('No Internet connection')
+            self._notify_no_internet = False
+            self._internet_id = self.after(30000, self.test_connection)
+        try:
+            self.after_cancel(self._update_id)
+        except ValueError:
+            pass
+        self.fetcher.cancel(*self._updating.values())
+        self._updating.clear()
+
+    def _feed_error(self, title, info):
+        """Handle feed fetching failure."""
+        if info is not None and info.get('error') == 'timeout':
+            self._cycle_stats['timeouts'] += 1
+            logging.warning("Fetching feed '%s' timed out, retrying later", title)
+            return
+        self._cycle_stats['errors'] += 1
+        if info is not None and info['status'] is None:
+            # the server could not be reached, check whether we are still online
+            logging.warning("Failed to download feed '%s', retrying later", title)
+            if self.fetcher.backend is None or self.fetcher.backend['mode'] != 'replay':
+                self.connectivity.probe()
+        elif info is not None and info['status'] in [429, 503]:
+            logging.warning("Server of feed '%s' is unavailable (HTTP %i), retrying later",
+                            title, info['status'])
+        else:
+            run(["notify-send", "-i", "dialog-error", _("Error"),
+                 _('{url} is not a valid feed.').format(url=FEEDS.get(title, 'url'))])
+            logging.error('%s is not a valid feed.', FEEDS.get(title, 'url'))
+
+    def _feed_update(self, title):
+        """Queue update of feed with given title as part of the current update cycle."""
+        if title in self._updating or self._suspended:
+            return
+        if self._cycle_start is None:
+            self._cycle_start = time.monotonic()
+        host = url_host(FEEDS.get(title, 'url'))
+        if not self.breaker.allow(host):
+            logging.info("Skipping feed '%s': server %s is failing", title, host)
+            self._cycle_stats['skipped'] += 1
+            self.scheduler.schedule(title, self.breaker.retry_time(host))
+            self._schedule_next_update()
+            return
+        logging.info("Updating feed '%s'", title)
+        if FEEDS.has_option(title, 'data'):
+            validators = {key: FEEDS.get(title, key, fallback='')
+                          for key in ['etag', 'modified']}
+        else:
+            # the feed data needs to be retrieved
+            validators = {}
+        retention = cst.feed_retention(title)
+        # without new entries, only the age limit can be exceeded
+        prune = bool(retention[1]) and \
+            time.time() - FEEDS.getint(title, 'pruned', fallback=0) > PRUNE_INTERVAL
+        self._updating[title] = self.fetcher.submit(FEEDS.get(title, 'url'),
+                                                    lambda info: self._feed_fetched(title, info),
+                                                    filename=FEEDS.get(title, 'data', fallback=''),
+                                                    retention=retention, prune=prune,
+                                                    **validators)
+
+    def feed_update(self):
+        """Update all feeds now."""
         for title in FEEDS.sections():
             if FEEDS.getboolean(title, 'active', fallback=True):
+                self.scheduler.remove(title)
                 self._feed_update(title)
-        self._check_end_update_id = self.after(2000, self._check_end_update)
+        self._schedule_next_update()
+        self._check_end_update()
+
+    def _check_result_update(self, title, info):
+        """Display the new entries of the feed, return whether the feed was updated."""
+        if info is None or not info['title']:
+            self._feed_error(title, info)
+            return False
+        self._feed_set_validators(title, info)
+        filename = info['filename']
+        if not filename:
+            # the feed data was removed, the next update will retrieve it again
+            FEEDS.remove_option(title, 'data')
+        elif filename != FEEDS.get(title, 'data', fallback=''):
+            FEEDS.set(title, 'data', filename)
+        FEEDS.set(title, 'pruned', '%i' % time.time())
+        self._feed_entries_pruned(title, info['pruned'])
+        # the entries saved by an interrupted job are loaded with the new ones
+        self.fetcher.interrupted(filename)
+        nb_new = self._feed_entries_sync(title)
+        if nb_new > info['new']:
+            logging.info("Feed '%s': %i entries saved by an interrupted update",
+                         title, nb_new - info['new'])
+        if not nb_new:
+            self._cycle_stats['up-to-date'] += 1
+            logging.info("Feed '%s' is up-to-date", title)
+            return False
+        self._cycle_stats['updated'] += 1
+        logging.info("Updated feed '%s': %i new entries", title, nb_new)
+        latest = info['latest']
+        updated = info['updated']
+        if CONFIG.getboolean("General", "notifications", fallback=True):
+            run(["notify-send", "-i", cst.IM_ICON_SVG, title,
+                 cst.html2text(latest)])
+        FEEDS.set(title, 'updated', '%i' % updated)
+        self.latests[title] = latest
+        category = FEEDS.get(title, 'category', fallback='')
+        self.cat_widgets['All'].update_display(title, latest, updated)
+        if category != '':
+            self.cat_widgets[category].update_display(title, latest, updated)
+        return True
 
-    def _check_result_update(self, title):
-        if self.threads[title].is_alive():
-            self._check_result_update_id[title] = self.after(1000,
-                                                             self._check_result_update,
-                                                             title)
-        else:
-            t, latest, updated, entry_title, summary, link = self.queues[title].get(False)
-            if not t:
-                if cst.internet_on():
-                    run(["notify-send", "-i", "dialog-error", _("Error"),
-                         _('{url} is not a valid feed.').format(url=FEEDS.get(title, 'url'))])
-                    logging.error('%s is not a valid feed.', FEEDS.get(title, 'url'))
-                else:
-                    if self._notify_no_internet:
-                        run(["notify-send", "-i", "dialog-error", _("Error"),
-                             _('No Internet connection.')])
-                        logging.warning('No Internet connection')
-                        self._notify_no_internet = False
-                        self._internet_id = self.after(30000, self.test_connection)
-                    after_ids = [self._update_id, self._check_add_id,
-                                 self._check_end_update_id, self._update_id]
-                    after_ids.extend(self._check_result_update_id.values())
-                    after_ids.extend(self._check_result_init_id.values())
-                    for after_id in after_ids:
-                        try:
-                            self.after_cancel(after_id)
-                        except ValueError:
-                            pass
-            else:
-                date = datetime.strptime(updated, '%Y-%m-%d %H:%M')
-                if date > datetime.strptime(FEEDS.get(title, 'updated'), '%Y-%m-%d %H:%M'):
-                    logging.info("Updated feed '%s'", title)
-                    if CONFIG.getboolean("General", "notifications", fallback=True):
-                        run(["notify-send", "-i", cst.IM_ICON_SVG, title,
-                             cst.html2text(latest)])
-                    FEEDS.set(title, 'updated', updated)
-                    category = FEEDS.get(title, 'category', fallback='')
-                    self.cat_widgets['All'].update_display(title, latest, updated)
-                    if category != '':
-                        self.cat_widgets[category].update_display(title, latest, updated)
-                    self.feed_widgets[title].entry_add(entry_title, updated,
-                                                       summary, link, 0)
-                    self.feed_widgets[title].sort_by_date()
-                    try:
-                        filename = FEEDS.get(title, 'data')
-                        old, data = cst.load_data(filename)
-                    except pickle.UnpicklingError:
-                        cst.save_data(filename, latest, [(entry_title, updated, summary, link)])
-                    except configparser.NoOptionError:
-                        filename = cst.new_data_file()
-                        FEEDS.set(title, 'data', filename)
-                        cst.save_data(filename, latest, [(entry_title, updated, summary, link)])
-                    else:
-                        data.insert(0, (entry_title, updated, summary, link))
-                        cst.save_data(filename, latest, data)
-                else:
-                    logging.info("Feed '%s' is up-to-date", title)
+    def _feeds_prune(self):
+        """Enforce the retention limits on all the feeds in the background, e.g. after a change of the settings."""
+        for title in FEEDS.sections():
+            if FEEDS.has_option(title, 'data'):
+                self.fetcher.prune(FEEDS.get(title, 'data'),
+                                   lambda info, title=title:
+                                       self._feed_entries_pruned(title, info and info.get('pruned')),
+                                   cst.feed_retention(title))
+
+    def _feed_entries_pruned(self, title, pruned):
+        """Remove the entries pruned from the entry store from the feed widget."""
+        if pruned and title in self.feed_widgets:
+            logging.info("Removed %i old entries of feed '%s'", len(pruned), title)
+            self.feed_widgets[title].entries_remove(pruned)
+
+    def _feed_entries_sync(self, title):
+        """
+        Display the entries of the feed saved in the entry store and not displayed yet.
+
+        Besides the new entries saved by the worker, they include the ones
+        saved by an update whose result was lost (cancelled or killed job).
+        Return their number.
+        """
+        widget = self.feed_widgets[title]
+        try:
+            data = cst.load_data(FEEDS.get(title, 'data'), ids=True,
+                                 after_id=widget.last_entry_id)[1]
+        except (configparser.NoOptionError, KeyError):
+            return 0
+        for entry_id, entry_title, date, summary, link in reversed(data):
+            widget.entry_add(entry_title, date, summary, link, 0, entry_id)
+        if data:
+            widget.sort_by_date()
+        return len(data)
 
     def _check_end_update(self):
-        b = [t.is_alive() for t in self.threads.values() if t is not None]
-        if sum(b):
-            self._check_end_update_id = self.after(1000, self._check_end_update)
-        else:
-            cst.save_feeds()
-            for widget in self.cat_widgets.values():
-                widget.sort()
-            self._update_id = self.after(CONFIG.getint("General", "update_delay"),
-                                         self.feed_update)
+        """Schedule the end of the update cycle, if it is not already scheduled."""
+        if not self._end_update_id:
+            self._end_update_id = self.after(END_UPDATE_DELAY, self._end_update)
+
+    def _end_update(self):
+        """
+        Save feeds and sort category widgets at the end of the update cycle.
+
+        The cycle covers the updates done since the previous one ended, so
+        that the feeds refreshed one after the other are not saved and
+        sorted after each update.
+        """
+        self._end_update_id = ""
+        if self._cycle_stats:
+            logging.info("Update cycle done: %i updated, %i up-to-date, "
+                         "%i not modified (304), %i errors, %i timeouts, "
+                         "%i skipped (failing server) in %.1fs",
+                         self._cycle_stats['updated'],
+                         self._cycle_stats['up-to-date'],
+                         self._cycle_stats['not modified'],
+                         self._cycle_stats['errors'],
+                         self._cycle_stats['timeouts'],
+                         self._cycle_stats['skipped'],
+                         time.monotonic() - self._cycle_start)
+            self._cycle_stats.clear()
+            cst.compact_data()
+        self._cycle_start = time.monotonic() if self._updating else None
+        cst.save_feeds()
+        for widget in self.cat_widgets.values():
+            widget.sort()
@@ -0,0 +1,183 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Pool of persistent HTTP connections
+"""
+import gzip
+import ssl
+import time
+import zlib
+from http.client import HTTPConnection, HTTPSConnection, BadStatusLine
+from urllib.parse import urlsplit, urljoin
+from urllib.request import getproxies
+
+
+REDIRECTIONS = (301, 302, 303, 307, 308)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# value of the Accept-Encoding header for the encodings handled by decode_content
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def decode_content(headers, body):
+    """
+    Return body decoded according to the Content-Encoding of the response.
+
+    headers: response headers (email.message.Message), the Content-Encoding
+             and Content-Length headers are removed since they do not apply
+             to the decoded body
+
+    Raise ValueError if the body cannot be decoded.
+    """
+    encoding = headers.get('content-encoding', '').strip().lower()
+    if encoding not in ('gzip', 'x-gzip', 'deflate') or not body:
+        return body
+    try:
+        if encoding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                # raw deflate stream sent by some servers
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+        else:
+            body = gzip.decompress(body)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError('Invalid %s content: %s' % (encoding, e))
+    del headers['content-encoding']
+    del headers['content-length']
+    return body
+
+
+class ConnectionPool:
+    """
+    Pool of persistent keep-alive HTTP(S) connections, grouped by host.
+
+    Up to size idle connections are kept for each host and reused for the
+    following requests to this host, as long as they have not been idle
+    for more than idle_timeout seconds.
+
+    connect_timeout and read_timeout (in seconds) are the maximum time
+    spent establishing a connection and waiting for data from the server.
+
+    The compressed bodies are decoded (see decode_content).
+    """
+
+    def __init__(self, size=2, idle_timeout=60, connect_timeout=None, read_timeout=None):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = {}     # {(scheme, host, port): [(connection, time of last use)]}
+        self._context = ssl.create_default_context()
+
+    def handles(self, url):
+        """Return whether url can be fetched with the pool (HTTP(S) without proxy)."""
+        scheme = urlsplit(url).scheme
+        return scheme in DEFAULT_PORTS and scheme not in getproxies()
+
+    def _get(self, key):
+        """Return (connection, reused) for key (scheme, host, port)."""
+        connections = self._idle.get(key, [])
+        now = time.monotonic()
+        while connections:
+            connection, last_use = connections.pop()
+            if now - last_use < self.idle_timeout:
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        if scheme == 'https':
+            connection = HTTPSConnection(host, port, timeout=self.connect_timeout,
+                                         context=self._context)
+        else:
+            connection = HTTPConnection(host, port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection, False
+
+    def _put(self, key, connection):
+        """Put back connection in the pool for later reuse."""
+        connections = self._idle.setdefault(key, [])
+        if len(connections) < self.size:
+            connections.append((connection, time.monotonic()))
+        else:
+            connection.close()
+
+    def _send(self, key, path, headers):
+        """Send GET request and return (response, body)."""
+        connection, reused = self._get(key)
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (ConnectionError, BadStatusLine):
+            connection.close()
+            if not reused:
+                raise
+            # the server closed the idle connection, retry with another one
+            return self._send(key, path, headers)
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._put(key, connection)
+        return response, decode_content(response.msg, body)
+
+    def request(self, url, headers=None, max_redirections=10):
+        """
+        GET url, following redirections.
+
+        Return (status, headers, body, url) where url is the final url.
+        """
+        if headers is None:
+            headers = {}
+        for i in range(max_redirections + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in DEFAULT_PORTS:
+                raise ValueError('Unsupported URL scheme: %s' % parts.scheme)
+            key = (parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS[parts.scheme])
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            response, body = self._send(key, path, headers)
+            location = response.getheader('location')
+            if response.status in REDIRECTIONS and location:
+                url = urljoin(url, location)
+            else:
+                return response.status, response.msg, body, url
+        raise OSError('Too many redirections for %s' % url)
+
+    def close_idle(self):
+        """Close the connections idle for more than idle_timeout."""
+        now = time.monotonic()
+        for key, connections in list(self._idle.items()):
+            for connection, last_use in connections:
+                if now - last_use >= self.idle_timeout:
+                    connection.close()
+            connections[:] = [(c, t) for c, t in connections if now - t < self.idle_timeout]
+            if not connections:
+                del self._idle[key]
+
+    def close(self):
+        """Close all connections."""
+        for connections in self._idle.values():
+            for connection, last_use in connections:
+                connection.close()
+        self._idle.clear()
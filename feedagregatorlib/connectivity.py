@@ -0,0 +1,85 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Internet connectivity monitor
+"""
+import logging
+import os
+import socket
+from threading import Thread
+from tkinter import READABLE
+
+
+class ConnectivityMonitor:
+    """
+    Cached online / offline state of the Internet connection.
+
+    The state is updated from the outcome of the feed downloads and from
+    probes (TCP connection to host:port) run in a background thread, so
+    that the Tk event loop is never blocked. The probe results are sent
+    through a pipe watched by the Tk event loop.
+
+    callback is called with the new state whenever it changes.
+    """
+
+    def __init__(self, master, callback, host='www.google.com', port=443, timeout=5):
+        self.master = master
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.online = True
+        self._probing = False
+        self._pipe_read, self._pipe_write = os.pipe()
+        self.master.tk.createfilehandler(self._pipe_read, READABLE, self._probe_done)
+
+    def _probe(self):
+        """Try to connect to host:port (run in a separate thread)."""
+        try:
+            socket.create_connection((self.host, self.port), self.timeout).close()
+            result = b'1'
+        except OSError:
+            result = b'0'
+        try:
+            os.write(self._pipe_write, result)
+        except OSError:
+            pass  # monitor closed
+
+    def probe(self):
+        """Check the connection in the background."""
+        if not self._probing:
+            self._probing = True
+            Thread(target=self._probe, daemon=True).start()
+
+    def _probe_done(self, *args):
+        self._probing = False
+        self.report(os.read(self._pipe_read, 1) == b'1')
+
+    def report(self, online):
+        """Update the connection state."""
+        if online != self.online:
+            self.online = online
+            logging.info('Internet connection %s', 'up' if online else 'down')
+            self.callback(online)
+
+    def close(self):
+        self.master.tk.deletefilehandler(self._pipe_read)
+        os.close(self._pipe_read)
+        os.close(self._pipe_write)
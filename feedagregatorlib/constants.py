@@ -44,8 +44,8 @@ Copyright 2007-2013 elementary LLC.
 
 Constants and functions
 """
-import pickle
 import os
+import hashlib
 import warnings
 import gettext
 import logging
@@ -60,6 +60,8 @@ import babel
 from dateutil.tz import gettz
 from bs4 import BeautifulSoup
 
+from feedagregatorlib.store import EntryStore
+
 
 APP_NAME = "FeedAgregator"
 
@@ -86,6 +88,8 @@ else:
 PATH_DATA = os.path.join(LOCAL_PATH, "data")
 if not os.path.exists(PATH_DATA):
     os.mkdir(PATH_DATA)
+PATH_CACHE = os.path.join(LOCAL_PATH, "cache")
+PATH_DB = os.path.join(LOCAL_PATH, "feeds.db")
 PATH_FEEDS = os.path.join(LOCAL_PATH, "feeds.conf")
 PATH_LATESTS = os.path.join(LOCAL_PATH, "latests.conf")
 PATH_CONFIG = os.path.join(LOCAL_PATH, "feedagregator.ini")
@@ -110,7 +114,25 @@ else:
     CONFIG.add_section("General")
     CONFIG.set("General", "trayicon", "")
     CONFIG.set("General", "update_delay", "3600000")
+    CONFIG.set("General", "min_update_delay", "600000")
+    CONFIG.set("General", "max_update_delay", "86400000")
+    CONFIG.set("General", "update_jitter", "10")
     CONFIG.set("General", "img_timeout", "10")
+    CONFIG.set("General", "fetch_workers", "4")
+    CONFIG.set("General", "connection_pool_size", "2")
+    CONFIG.set("General", "connection_idle_timeout", "60")
+    CONFIG.set("General", "connect_timeout", "10")
+    CONFIG.set("General", "read_timeout", "30")
+    CONFIG.set("General", "connectivity_host", "www.google.com")
+    CONFIG.set("General", "connectivity_port", "443")
+    CONFIG.set("General", "breaker_threshold", "3")
+    CONFIG.set("General", "breaker_cooldown", "300")
+    CONFIG.set("General", "host_max_connections", "2")
+    CONFIG.set("General", "host_min_spacing", "1")
+    CONFIG.set("General", "http_cache_size", "50")
+    CONFIG.set("General", "max_entries", "500")
+    CONFIG.set("General", "max_entry_age", "0")
+    CONFIG.set("General", "max_feed_size", "0")
     CONFIG.set("General", "language", getdefaultlocale()[0])
     CONFIG.set("General", "check_update", "True")
     CONFIG.set("General", "confirm_cat_remove", "True")
@@ -189,38 +211,102 @@ def save_latests():
         LATESTS.write(fichier)
 
 
+STORE = EntryStore(PATH_DB, PATH_DATA)
+
+
 def new_data_file():
-    """Return unused name for feed data file."""
-    l = os.listdir(PATH_DATA)
-    i = 0
-    name = "feed{}.dat"
-    while name.format(i) in l:
-        i += 1
-    return name.format(i)
+    """
+    Return unused name for feed data.
+
+    The (empty) feed is created in the entry store so that the name cannot
+    be given twice, even by different processes.
+    """
+    return STORE.new_feed()
+
+
+def load_data(filename, limit=-1, ids=False, after_id=0):
+    """
+    Load feed data (latest, entries) from the entry store.
+
+    Return at most limit entries if limit is not negative, with their id
+    first if ids is True, only the ones added after the entry after_id.
+    Raise KeyError if there is no data for filename.
+    """
+    return STORE.load(filename, limit, ids, after_id)
+
+
+def add_entries(filename, latest, entries, keys, retention=None):
+    """
+    Add the entries not seen yet to the feed data stored in filename.
+
+    latest: html content for the latest entry
+    entries: list of (title, date, summary, link)
+    keys: list of the keys identifying each entry (see entry_keys)
+    retention: (max_entries, max_age, max_size) limits enforced after
+               adding the entries (see feed_retention), None for no limit
+
+    The new entries are put first. Return the number of new entries and
+    the ids of the entries removed because of the retention limits.
+    """
+    return STORE.add_entries(filename, latest, entries, keys, retention)
+
+
+def prune_data(filename, retention):
+    """
+    Remove the entries of the feed data exceeding the retention limits.
+
+    Return the ids of the removed entries. Raise KeyError if there is no
+    data for filename.
+    """
+    return STORE.prune(filename, *retention)
+
+
+def feed_retention(title=''):
+    """
+    Return the retention limits (max_entries, max_age, max_size) of the feed title.
+
+    The limits set in the feed section of FEEDS override the global ones,
+    which are returned if title is not a feed.
+    The maximum age is in seconds and the maximum size in bytes.
+    """
+    def get(option, default=0):
+        return FEEDS.getint(title, option, fallback=CONFIG.getint('General', option, fallback=default))
 
+    return get('max_entries', 500), get('max_entry_age') * 86400, get('max_feed_size') * 1024
 
-def save_data(filename, latest, data):
-    """Save (pickle) feed data to filename."""
-    with open(os.path.join(PATH_DATA, filename), 'wb') as file:
-        pick = pickle.Pickler(file)
-        pick.dump(latest)
-        pick.dump(data)
 
+def compact_data():
+    """Merge the entries appended since the last call into the entry store."""
+    return STORE.compact()
 
-def load_data(filename):
-    """Load feed data from filename."""
-    with open(os.path.join(PATH_DATA, filename), 'rb') as file:
-        pick = pickle.Unpickler(file)
-        latest = pick.load()
-        data = pick.load()
-    return latest, data
 
+def remove_data(filename):
+    """Remove feed data from the entry store."""
+    STORE.remove(filename)
 
-def feed_get_latest(filename):
-    with open(os.path.join(PATH_DATA, filename), 'rb') as file:
-        pick = pickle.Unpickler(file)
-        latest = pick.load()
-    return latest
+
+def remove_unused_data(filenames):
+    """Remove the feed data not in filenames from the entry store, e.g. left by an aborted fetch."""
+    return STORE.remove_unused(filenames)
+
+
+def entry_keys(title, link, guid=''):
+    """
+    Return the keys identifying a feed entry.
+
+    The entry is identified by its GUID, if any, and by a hash of its link
+    and title, so that entries stored before the GUIDs were recorded are
+    still recognized.
+    """
+    keys = [hashlib.sha1('{}\n{}'.format(link, title).encode()).hexdigest()]
+    if guid:
+        keys.append(guid)
+    return keys
+
+
+def feeds_get_latest(filenames):
+    """Return {filename: html content for the latest entry} for all the feeds at once."""
+    return STORE.latests(filenames)
 
 
 # --- images
@@ -431,12 +517,3 @@ def html2text(html):
     """Convert html string to basic text string."""
     soup = BeautifulSoup(html, 'html.parser')
     return soup.get_text()
-
-
-def internet_on():
-    """Check the Internet connexion."""
-    try:
-        check_output(["ping", "-c", "1", "www.google.com"])
-        return True
-    except CalledProcessError:
-        return False
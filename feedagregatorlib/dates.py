@@ -0,0 +1,89 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Date handling
+
+Dates are stored as timestamps (integer number of seconds since the epoch)
+and only converted to the local time for display.
+"""
+import calendar
+import time
+from datetime import datetime
+from functools import lru_cache
+from locale import getlocale
+
+import dateutil.parser
+from babel.dates import format_datetime
+
+from feedagregatorlib.constants import TZINFOS
+
+
+LEGACY_FORMAT = '%Y-%m-%d %H:%M'  # format of the dates stored by older versions
+
+
+@lru_cache(maxsize=1024)
+def parse_date(date):
+    """Return the timestamp of the date string (None if it cannot be parsed)."""
+    try:
+        return int(dateutil.parser.parse(date, tzinfos=TZINFOS).timestamp())
+    except (ValueError, OverflowError):
+        return None
+
+
+def entry_timestamp(entry, default):
+    """
+    Return the timestamp of the feedparser entry.
+
+    The dates already parsed by feedparser are used if available, the raw
+    date strings are parsed otherwise. Return default if the entry has no
+    valid date.
+    """
+    for key in ['updated', 'published']:
+        parsed = entry.get(key + '_parsed')
+        if parsed:
+            return calendar.timegm(parsed)
+        if entry.get(key):
+            timestamp = parse_date(entry[key])
+            if timestamp is not None:
+                return timestamp
+    return default
+
+
+@lru_cache(maxsize=1024)
+def _legacy_timestamp(date):
+    return int(time.mktime(time.strptime(date, LEGACY_FORMAT)))
+
+
+def to_timestamp(date):
+    """
+    Return the timestamp of the stored date.
+
+    date: timestamp (int or str) or date string stored by an older version
+    """
+    try:
+        return int(date)
+    except ValueError:
+        return _legacy_timestamp(date)
+
+
+def format_date(date):
+    """Format stored date in local time for display."""
+    return format_datetime(datetime.fromtimestamp(to_timestamp(date)).astimezone(tz=None),
+                           'short', locale=getlocale()[0])
@@ -0,0 +1,94 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Feed autodiscovery in HTML pages
+"""
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+
+FEED_TYPES = ('application/atom+xml', 'application/rss+xml', 'application/rdf+xml',
+              'application/xml', 'text/xml')
+
+
+class _FeedLinkParser(HTMLParser):
+    """Collect the <link rel="alternate"> feed links of the page head."""
+
+    def __init__(self, base_url):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.base_url = base_url
+        self.links = []     # [(title, url, type)]
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            link_type = (attrs.get('type') or '').lower().split(';')[0].strip()
+            if 'alternate' in rel and link_type in FEED_TYPES and attrs.get('href'):
+                self.links.append((attrs.get('title') or '',
+                                   urljoin(self.base_url, attrs['href'].strip()),
+                                   link_type))
+        elif tag == 'body':
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.done = True
+
+
+def is_html(headers, body):
+    """Return whether the response is an HTML page."""
+    content_type = headers.get('content-type', '').lower()
+    if 'html' in content_type:
+        return True
+    start = body[:512].lstrip().lower()
+    return start.startswith(b'<!doctype html') or start.startswith(b'<html')
+
+
+def discover_feeds(body, base_url, encoding='utf-8'):
+    """
+    Return the list of (title, url) of the feeds advertised by the HTML page.
+
+    The feeds are sorted from the most to the least likely main feed of the
+    site: Atom and RSS feeds first, comment feeds last, in document order
+    otherwise.
+    """
+    parser = _FeedLinkParser(base_url)
+    text = body.decode(encoding, errors='replace')
+    # only the head of the page is needed, feed it in chunks to stop early
+    for i in range(0, len(text), 8192):
+        parser.feed(text[i:i + 8192])
+        if parser.done:
+            break
+    urls = set()
+    links = []
+    for index, (title, url, link_type) in enumerate(parser.links):
+        if url in urls:
+            continue
+        urls.add(url)
+        comments = 'comment' in title.lower() or 'comment' in url.lower()
+        links.append(((comments, link_type not in FEED_TYPES[:2], index), title, url))
+    links.sort()
+    return [(title, url) for key, title, url in links]
@@ -0,0 +1,739 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Feed fetching engine: pool of persistent worker processes
+"""
+import codecs
+import logging
+import re
+import socket
+import time
+from collections import deque
+from multiprocessing import Process, Pipe
+from email.utils import parsedate_to_datetime
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError, URLError
+from tkinter import READABLE
+
+import feedparser
+
+from feedagregatorlib.constants import entry_keys, new_data_file, add_entries, prune_data, \
+    remove_data, PATH_CACHE
+from feedagregatorlib.dates import entry_timestamp
+from feedagregatorlib.scheduler import publishing_period
+from feedagregatorlib.connection_pool import ConnectionPool, ACCEPT_ENCODING, decode_content
+from feedagregatorlib.hosts import HostLimiter, url_host
+from feedagregatorlib.replay import make_backend
+from feedagregatorlib.http_cache import HTTPCache, CachingBackend
+from feedagregatorlib.discovery import is_html, discover_feeds
+
+
+SY_PERIODS = {'hourly': 3600, 'daily': 86400, 'weekly': 604800,
+              'monthly': 2592000, 'yearly': 31536000}
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_SKIP_HOURS = re.compile(rb'<skipHours>(.*?)</skipHours>', re.S | re.I)
+_SKIP_DAYS = re.compile(rb'<skipDays>(.*?)</skipDays>', re.S | re.I)
+_HOUR = re.compile(rb'<hour>\s*(\d+)\s*</hour>', re.I)
+_DAY = re.compile(rb'<day>\s*(\w+)\s*</day>', re.I)
+
+
+def download(url, etag='', modified='', pool=None, timeout=None):
+    """
+    Download url, sending the given validators.
+
+    pool: fetch backend (ConnectionPool or see replay module) used for
+          the urls it handles
+    timeout: timeout (in seconds) of the blocking operations when the pool
+             is not used
+
+    Return (status, headers, body), the header names are in lower case and
+    the body is decoded if it was compressed.
+    """
+    request_headers = {'User-Agent': feedparser.USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+    if etag:
+        request_headers['If-None-Match'] = etag
+    if modified:
+        request_headers['If-Modified-Since'] = modified
+    if pool is not None and pool.handles(url):
+        status, headers, body, url = pool.request(url, request_headers)
+        headers = {key.lower(): val for key, val in headers.items()}
+        headers.setdefault('content-location', url)
+        return status, headers, body
+    request = Request(url, headers=request_headers)
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            status = response.getcode()
+            headers = response.headers
+            body = response.read()
+            url = response.geturl()
+    except HTTPError as e:
+        status = e.code
+        headers = e.headers
+        body = e.read()
+    body = decode_content(headers, body)
+    headers = {key.lower(): val for key, val in headers.items()}
+    headers.setdefault('content-location', url)
+    return status, headers, body
+
+
+def _http_delay(value, date=None):
+    """
+    Convert the value of Retry-After or Expires to a delay in seconds.
+
+    value: number of seconds or HTTP date
+    date: value of the Date header
+    """
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        expires = parsedate_to_datetime(value).timestamp()
+        now = parsedate_to_datetime(date).timestamp() if date else time.time()
+    except (TypeError, ValueError):
+        return 0
+    return max(0, expires - now)
+
+
+def refresh_hints(headers, feed=None, body=b''):
+    """
+    Gather the refresh hints declared by the server and by the feed.
+
+    headers: HTTP headers of the response
+    feed: feedparser result (None if the feed was not parsed)
+    body: raw feed document
+
+    Return a dictionary with keys
+
+        'http_delay': minimum delay before the next refresh according to
+                      Cache-Control, Expires and Retry-After (seconds)
+        'feed_delay': minimum delay between two refreshes according to the
+                      RSS <ttl> or sy:updatePeriod and sy:updateFrequency
+        'skip_hours': list of hours (GMT) during which not to refresh
+        'skip_days': list of days (0 = Monday) during which not to refresh
+
+    Only 'http_delay' is present if feed is None.
+    """
+    date = headers.get('date')
+    http_delay = 0
+    if 'retry-after' in headers:
+        http_delay = _http_delay(headers['retry-after'], date)
+    cache_control = headers.get('cache-control', '').lower()
+    max_age = re.search(r'max-age\s*=\s*"?(\d+)', cache_control)
+    age = headers.get('age', '0').strip()
+    if max_age:
+        http_delay = max(http_delay, int(max_age.group(1)) - (int(age) if age.isdigit() else 0))
+    elif 'expires' in headers and 'no-cache' not in cache_control:
+        http_delay = max(http_delay, _http_delay(headers['expires'], date))
+    hints = {'http_delay': http_delay}
+    if feed is None:
+        return hints
+
+    feed_delay = 0
+    try:
+        feed_delay = int(feed['feed'].get('ttl', 0)) * 60
+    except ValueError:
+        pass
+    period = SY_PERIODS.get(feed['feed'].get('sy_updateperiod', '').strip().lower())
+    if period:
+        try:
+            frequency = max(1, int(feed['feed'].get('sy_updatefrequency', 1)))
+        except ValueError:
+            frequency = 1
+        feed_delay = max(feed_delay, period / frequency)
+    hints['feed_delay'] = feed_delay
+
+    skip_hours = _SKIP_HOURS.search(body)
+    skip_days = _SKIP_DAYS.search(body)
+    hints['skip_hours'] = sorted({int(h) % 24 for h in _HOUR.findall(skip_hours.group(1))}) if skip_hours else []
+    hints['skip_days'] = sorted({DAYS.index(d.decode().lower()) for d in _DAY.findall(skip_days.group(1))
+                                 if d.decode().lower() in DAYS}) if skip_days else []
+    return hints
+
+
+def fetch_error(error):
+    """Return the result of feed_get_info for a failed download."""
+    return {'status': None, 'etag': '', 'modified': '',
+            'hints': {'http_delay': 0}, 'title': '', 'error': error}
+
+
+def _charset(headers):
+    """Return the charset of the response."""
+    match = re.search(r'charset\s*=\s*"?([\w.:-]+)', headers.get('content-type', ''), re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def feed_discover(url, status, headers, body, pool=None):
+    """
+    Look for the feeds advertised by the HTML page downloaded from url.
+
+    The best candidate feed which can be fetched is returned (see
+    feed_get_info), with the additional key 'url' (feed url). Otherwise,
+    a result for an invalid feed is returned. In both cases, 'candidates'
+    contains the list of (title, url) of the feeds found in the page.
+    """
+    candidates = discover_feeds(body, headers.get('content-location', url), _charset(headers))
+    logging.info('%i feed(s) found in %s', len(candidates), url)
+    for title, feed_url in candidates[:3]:
+        info = feed_get_info(feed_url, pool=pool)
+        if info.get('title'):
+            info['url'] = feed_url
+            info['candidates'] = candidates
+            return info
+    return {'status': status, 'etag': '', 'modified': '', 'hints': refresh_hints(headers),
+            'title': '', 'candidates': candidates}
+
+
+def feed_get_info(url, etag=None, modified=None, pool=None, discover=False):
+    """
+    Fetch and parse feed.
+
+    etag, modified: validators from the previous fetch, if the feed has not
+                    changed since, the server answers with 304 and the
+                    feed is not parsed.
+    pool: fetch backend used to download the feed (see download)
+    discover: if url is an HTML page and not a feed, fetch the feed it
+              advertises instead (see feed_discover), the already
+              downloaded page is reused
+
+    Return a dictionary with keys
+
+        'status': HTTP status (None if the feed is not fetched over HTTP)
+        'etag', 'modified': validators to use for the next fetch
+        'hints': refresh hints (see refresh_hints)
+        'title': feed title ('' if it is not a valid feed)
+        'latest': html content for the latest entry
+        'updated': date of the latest entry (timestamp)
+        'entries': list of (title, date, summary, link) for all entries,
+                   the dates are timestamps
+        'keys': list of the keys identifying each entry (see entry_keys)
+        'period': estimated publishing period of the feed (in seconds)
+
+    Only the first four items are present if the feed is not modified. If
+    the download failed, only the first five are present, plus 'error'
+    ('timeout' or 'network'). With discover, 'url' and 'candidates' can be
+    present (see feed_discover).
+    """
+    try:
+        status, headers, body = download(url, etag, modified, pool,
+                                         pool.read_timeout if pool else None)
+    except (URLError, OSError, ValueError) as e:
+        logging.warning('Failed to download %s: %s', url, e)
+        timeout = isinstance(e, socket.timeout) or isinstance(getattr(e, 'reason', None), socket.timeout)
+        return fetch_error('timeout' if timeout else 'network')
+    info = {'status': status,
+            'etag': headers.get('etag', ''),
+            'modified': headers.get('last-modified', '')}
+    if status == 304:
+        info['hints'] = refresh_hints(headers)
+        return info
+    if status is not None and status >= 400:
+        info['hints'] = refresh_hints(headers)
+        info['title'] = ''
+        return info
+    feed = feedparser.parse(body, response_headers=headers)
+    if discover and not feed.get('version') and is_html(headers, body):
+        # not a feed (some feeds are served as text/html)
+        return feed_discover(url, status, headers, body, pool)
+    info['hints'] = refresh_hints(headers, feed, body)
+    entries = feed['entries']
+    now = int(time.time())
+    data = []
+    keys = []
+    for entry in entries:
+        title = entry.get('title', '')
+        summary = entry.get('summary', '')
+        date = entry_timestamp(entry, now)
+        link = entry.get('link', '')
+        data.append((title, date, summary, link))
+        keys.append(entry_keys(title, link, entry.get('id', '')))
+    if data:
+        entry_title, updated, summary, link = data[0]
+        latest = """<p id=title>{}</p>\n{}""".format(entry_title, summary)
+    else:
+        latest = ""
+        updated = now
+    info['title'] = feed['feed'].get('title', '')
+    info['latest'] = latest
+    info['updated'] = updated
+    info['period'] = publishing_period([entry[1] for entry in data])
+    info['entries'] = data
+    info['keys'] = keys
+    return info
+
+
+def prune_entries(filename, retention):
+    """Enforce the retention limits on the feed data file, return the ids of the removed entries."""
+    try:
+        return prune_data(filename, retention)
+    except KeyError:
+        return []
+
+
+def store_entries(info, filename, retention=None, prune=False):
+    """
+    Save the new entries of the fetch result info in the feed data file.
+
+    filename: name of the feed data file ('' to create a new one)
+    retention: retention limits of the feed (see add_entries)
+    prune: whether to enforce the retention limits if the feed is not modified
+
+    The entries and their keys are replaced in info by the name of the data
+    file ('filename', '' if it was removed during the fetch), the number of
+    new entries ('new') and the ids of the entries removed because of the
+    retention limits ('pruned'), so that only a small result is sent back
+    to the GUI.
+
+    If the feed is not modified, nothing is saved, the retention limits are
+    only enforced if prune is True ('pruned' is then added to info).
+    """
+    if info.get('status') == 304:
+        if prune and filename and retention is not None:
+            info['pruned'] = prune_entries(filename, retention)
+        return
+    if not info.get('title'):
+        return
+    if not filename:
+        filename = new_data_file()
+    try:
+        info['new'], info['pruned'] = add_entries(filename, info['latest'], info.pop('entries'),
+                                                  info.pop('keys'), retention)
+    except KeyError:
+        logging.warning('Feed data %s was removed during the fetch', filename)
+        info['new'], info['pruned'] = 0, []
+        filename = ''
+    info['filename'] = filename
+
+
+def _worker(conn, pool_size, idle_timeout, connect_timeout, read_timeout, backend=None,
+            cache_size=0):
+    """
+    Worker process main loop: fetch the feeds sent through conn.
+
+    The results are sent back through conn. The new entries are saved by
+    the worker for the jobs with a data filename, only a summary is sent.
+    The jobs without url only enforce the retention limits on the data
+    file (see FeedFetcher.prune).
+
+    The worker keeps up to pool_size keep-alive connections per host,
+    closed after idle_timeout seconds of inactivity.
+
+    backend: options of the record / replay backend (see make_backend)
+    cache_size: maximum size of the HTTP cache (in bytes, 0 to disable it),
+                the cache is not used with the record / replay backends
+    """
+    pool = make_backend(ConnectionPool(pool_size, idle_timeout, connect_timeout, read_timeout),
+                        backend)
+    if backend is None and cache_size:
+        pool = CachingBackend(pool, HTTPCache(PATH_CACHE, cache_size))
+    while True:
+        if not conn.poll(idle_timeout):
+            pool.close_idle()
+            continue
+        job = conn.recv()
+        if job is None:
+            break
+        job_id, url, etag, modified, filename, discover, retention, prune = job
+        try:
+            if url is None:
+                info = {'pruned': prune_entries(filename, retention)}
+            else:
+                info = feed_get_info(url, etag, modified, pool, discover)
+                if filename is not None:
+                    store_entries(info, filename, retention, prune)
+        except Exception:
+            logging.exception('Error while fetching %s', url)
+            info = None
+        conn.send((job_id, info))
+    pool.close()
+
+
+class _Worker:
+    """Handle on a worker process."""
+
+    def __init__(self, target, args):
+        self.conn, conn_child = Pipe()
+        self.process = Process(target=target, args=(conn_child,) + args, daemon=True)
+        self.process.start()
+        conn_child.close()
+        self.job_id = None      # running job
+        self.filename = None    # data filename of the running job
+        self.host = ''          # host of the running job
+        self.started = 0        # start time of the running job
+        self.hosts = {}         # {host: time of last job}, to reuse open connections
+        self.generation = 0     # workers from an older generation are replaced when idle
+
+    def send(self, job, host):
+        self.conn.send(job)
+        self.job_id = job[0]
+        self.filename = job[4]
+        self.host = host
+        self.started = time.monotonic()
+        self.hosts[host] = self.started
+
+
+class FeedFetcher:
+    """
+    Bounded pool of persistent worker processes fetching feeds.
+
+    Jobs are queued and dispatched to the idle workers, the workers are
+    reused for all the jobs. When a job is done, its callback is called
+    in the Tk mainloop with the result of feed_get_info (None on failure).
+
+    The workers send their results through pipes watched by the Tk event
+    loop so that they are processed as soon as they arrive.
+
+    Each worker keeps the connections it opened alive, so jobs are sent
+    preferably to a worker that recently fetched a feed from the same host.
+
+    The jobs are queued per host and the hosts are served in turn, within
+    the limits of the HostLimiter: a host reaching its limits does not
+    delay the jobs for the other hosts. The jobs which do not access the
+    network (see prune) are queued under the host None, without limits.
+
+    The downloads are aborted after connect_timeout seconds without
+    connection to the server or read_timeout seconds without data. As a
+    last resort, the workers still busy after connect_timeout + read_timeout
+    (+ grace delay) are killed and the result of their job is a timeout error.
+
+    backend: None to fetch the feeds from the network, otherwise options
+             of the record / replay backend (see replay.make_backend)
+    cache_size: maximum size of the on-disk HTTP cache (in bytes, 0 to disable it)
+    """
+
+    GRACE_DELAY = 5
+
+    def __init__(self, master, nb_workers=4, pool_size=2, idle_timeout=60,
+                 connect_timeout=10, read_timeout=30, limiter=None, backend=None,
+                 cache_size=0):
+        self.master = master
+        self.nb_workers = max(1, nb_workers)
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.limiter = HostLimiter() if limiter is None else limiter
+        self.backend = backend
+        self.cache_size = cache_size
+        self._generation = 0
+        self._jobs = {}             # {host: pending jobs (job_id, url, etag, modified, filename, discover, retention, prune)}
+        self._callbacks = {}        # {job_id: callback}
+        self._new_data = set()      # ids of the jobs creating new feed data (filename='')
+        self._interrupted = set()   # data filenames of the interrupted jobs which may have saved entries
+        self._workers = []          # [_Worker]
+        self._job_id = 0
+        self._watchdog_id = ""
+        self._wakeup_id = ""
+
+    @property
+    def deadline(self):
+        """Maximum duration of a job (in seconds)."""
+        return self.connect_timeout + self.read_timeout + self.GRACE_DELAY
+
+    def _spawn_worker(self):
+        worker = _Worker(_worker, (self.pool_size, self.idle_timeout,
+                                   self.connect_timeout, self.read_timeout, self.backend,
+                                   self.cache_size))
+        worker.generation = self._generation
+        self._workers.append(worker)
+        self.master.tk.createfilehandler(worker.conn, READABLE,
+                                         lambda *args: self._check_results(worker))
+        # get notified if the worker dies
+        self.master.tk.createfilehandler(worker.process.sentinel, READABLE,
+                                         lambda *args: self._worker_died(worker))
+        return worker
+
+    def _stop_worker(self, worker):
+        self._workers.remove(worker)
+        self.master.tk.deletefilehandler(worker.conn)
+        self.master.tk.deletefilehandler(worker.process.sentinel)
+        if worker.job_id is None and worker.process.is_alive():
+            worker.conn.send(None)
+        else:
+            self._job_done(worker)
+            worker.process.terminate()
+        worker.conn.close()
+
+    def _job_done(self, worker):
+        """Mark worker as idle."""
+        if worker.job_id is not None:
+            worker.job_id = None
+            if worker.host is not None:
+                self.limiter.done(worker.host)
+
+    def _pick_worker(self, host, idle):
+        """Return the idle worker with the most recent connection to host."""
+        limit = time.monotonic() - self.idle_timeout
+        best = max(idle, key=lambda w: w.hosts.get(host, 0))
+        return best if best.hosts.get(host, 0) > limit else idle[0]
+
+    def _next_job(self, now):
+        """
+        Return (job, host) for the next job that can be started now.
+
+        If there is none, return (None, t) where t is the (monotonic) time
+        at which a job can be started (None if not known).
+        """
+        wake = None
+        for host, jobs in self._jobs.items():
+            ready = 0 if host is None else self.limiter.ready_time(host, now)
+            if ready == 0:
+                job = jobs.popleft()
+                # put the host at the end of the queue to serve the hosts in turn
+                del self._jobs[host]
+                if jobs:
+                    self._jobs[host] = jobs
+                return job, host
+            elif ready is not None and (wake is None or ready < wake):
+                wake = ready
+        return None, wake
+
+    def _dispatch(self):
+        """Send pending jobs to idle workers and retire surplus or outdated idle workers."""
+        idle = []
+        for worker in [w for w in self._workers if w.job_id is None]:
+            if len(self._workers) > self.nb_workers or worker.generation != self._generation:
+                self._stop_worker(worker)
+            else:
+                idle.append(worker)
+        now = time.monotonic()
+        wake = None
+        while idle or len(self._workers) < self.nb_workers:
+            job, host = self._next_job(now)
+            if job is None:
+                wake = host
+                break
+            if idle:
+                worker = self._pick_worker(host, idle)
+                idle.remove(worker)
+            else:
+                worker = self._spawn_worker()
+            if host is not None:
+                self.limiter.start(host, now)
+            worker.send(job, host)
+        self._arm_wakeup(wake)
+        self._arm_watchdog()
+
+    def _arm_wakeup(self, wake):
+        """Arm the timer dispatching the jobs delayed by the host limits."""
+        try:
+            self.master.after_cancel(self._wakeup_id)
+        except ValueError:
+            pass
+        if wake is None:
+            self._wakeup_id = ""
+        else:
+            delay = max(0, int((wake - time.monotonic()) * 1000)) + 10
+            self._wakeup_id = self.master.after(delay, self._wakeup)
+
+    def _wakeup(self):
+        self._wakeup_id = ""
+        self._dispatch()
+
+    def _arm_watchdog(self):
+        """Arm the timer killing the next overdue job."""
+        try:
+            self.master.after_cancel(self._watchdog_id)
+        except ValueError:
+            pass
+        busy = [w.started for w in self._workers if w.job_id is not None]
+        if busy:
+            delay = min(busy) + self.deadline - time.monotonic()
+            self._watchdog_id = self.master.after(max(0, int(delay * 1000)) + 10,
+                                                  self._kill_overdue)
+        else:
+            self._watchdog_id = ""
+
+    def _kill_overdue(self):
+        """Kill the workers whose job is overdue."""
+        self._watchdog_id = ""
+        limit = time.monotonic() - self.deadline
+        for worker in [w for w in self._workers if w.job_id is not None and w.started <= limit]:
+            # make sure a result sent in the meantime is not lost
+            self._check_results(worker, dispatch=False)
+            if worker.job_id is None:
+                continue
+            job_id = worker.job_id
+            if worker.filename:
+                self._interrupted.add(worker.filename)
+            self._stop_worker(worker)
+            self._new_data.discard(job_id)
+            callback = self._callbacks.pop(job_id, None)
+            if callback is not None:
+                logging.warning('Fetch job %i cancelled after %is', job_id, self.deadline)
+                callback(fetch_error('timeout'))
+        self._dispatch()
+
+    def _check_results(self, worker, dispatch=True):
+        """Process the result sent by worker."""
+        try:
+            if not worker.conn.poll():
+                return
+            job_id, info = worker.conn.recv()
+        except (EOFError, OSError):
+            return  # the worker died, handled by _worker_died
+        if worker.job_id == job_id:
+            self._job_done(worker)
+        if dispatch:
+            self._dispatch()
+        callback = self._callbacks.pop(job_id, None)
+        new_data = job_id in self._new_data
+        self._new_data.discard(job_id)
+        if callback is not None:
+            callback(info)
+        elif new_data and info and info.get('filename'):
+            # cancelled job: nobody will use the feed data it created
+            remove_data(info['filename'])
+        elif info and info.get('new'):
+            # cancelled job: its new entries are not in any result
+            self._interrupted.add(info['filename'])
+
+    def _worker_died(self, worker):
+        """Replace worker that died unexpectedly."""
+        if worker not in self._workers:
+            return
+        # make sure the result the worker sent before dying is processed
+        self._check_results(worker, dispatch=False)
+        if worker not in self._workers:
+            return
+        job_id = worker.job_id
+        if worker.filename:
+            self._interrupted.add(worker.filename)
+        self._stop_worker(worker)
+        self._new_data.discard(job_id)
+        callback = self._callbacks.pop(job_id, None)
+        if callback is not None:
+            logging.error('Fetch worker died unexpectedly')
+            callback(None)
+        self._dispatch()
+
+    def _queue(self, host, callback, *job):
+        """Queue job for host and return its id."""
+        self._job_id += 1
+        self._callbacks[self._job_id] = callback
+        self._jobs.setdefault(host, deque()).append((self._job_id,) + job)
+        self._dispatch()
+        return self._job_id
+
+    def submit(self, url, callback, etag='', modified='', filename=None, discover=False,
+               retention=None, prune=False):
+        """
+        Queue feed fetching job and return its id.
+
+        callback: function called with the result of feed_get_info.
+        etag, modified: HTTP validators for conditional fetching.
+        filename: if not None, name of the data file in which the new
+                  entries are saved ('' to create a new file), see
+                  store_entries. The new file is removed if the job is
+                  cancelled.
+        discover: whether to look for the feed advertised by url if it is
+                  an HTML page (see feed_get_info)
+        retention: retention limits enforced when saving the entries
+                   (see add_entries)
+        prune: whether to enforce the retention limits even if the feed
+               is not modified (see store_entries)
+        """
+        job_id = self._queue(url_host(url), callback, url, etag, modified, filename,
+                             discover, retention, prune)
+        if filename == '':
+            self._new_data.add(job_id)
+        return job_id
+
+    def prune(self, filename, callback, retention):
+        """
+        Queue job enforcing the retention limits on the feed data filename and return its id.
+
+        callback: function called with {'pruned': ids of the removed entries}
+                  (or with the result of a failed job, see fetch_error)
+        """
+        return self._queue(None, callback, None, '', '', filename, False, retention, False)
+
+    def cancel(self, *job_ids):
+        """Cancel jobs: drop them if pending, otherwise ignore their results."""
+        job_ids = set(job_ids)
+        for host, jobs in list(self._jobs.items()):
+            jobs = deque(job for job in jobs if job[0] not in job_ids)
+            if jobs:
+                self._jobs[host] = jobs
+            else:
+                del self._jobs[host]
+        for job_id in job_ids:
+            self._callbacks.pop(job_id, None)
+        # the pending jobs did not create any data
+        self._new_data.difference_update(job_ids.difference(w.job_id for w in self._workers))
+
+    def interrupted(self, filename):
+        """
+        Return whether a job on the feed data filename was interrupted since the last call.
+
+        The entries saved by a job cancelled while it was running, or killed,
+        are not in any result, they have to be loaded from the entry store.
+        """
+        if filename in self._interrupted:
+            self._interrupted.remove(filename)
+            return True
+        return False
+
+    def clear(self):
+        """Drop all pending jobs and ignore the results of the running ones."""
+        self._jobs.clear()
+        self._callbacks.clear()
+        self._new_data.intersection_update(w.job_id for w in self._workers)
+
+    def resize(self, nb_workers):
+        """Change the maximum number of workers."""
+        self.nb_workers = max(1, nb_workers)
+        self._dispatch()
+
+    def configure(self, **options):
+        """
+        Change the connection settings.
+
+        options: pool_size, idle_timeout, connect_timeout, read_timeout,
+                 cache_size (the workers are replaced when idle) and max_connections,
+                 spacing, overrides (see HostLimiter)
+        """
+        restart = False
+        for key in ['pool_size', 'idle_timeout', 'connect_timeout', 'read_timeout', 'cache_size']:
+            if key in options and options[key] != getattr(self, key):
+                setattr(self, key, options[key])
+                restart = True
+        for key in ['max_connections', 'spacing', 'overrides']:
+            if key in options:
+                setattr(self.limiter, key, options[key])
+        if restart:
+            self._generation += 1
+        self._dispatch()
+
+    def stop(self):
+        """Stop all workers."""
+        self.clear()
+        for after_id in [self._watchdog_id, self._wakeup_id]:
+            try:
+                self.master.after_cancel(after_id)
+            except ValueError:
+                pass
+        for worker in list(self._workers):
+            self._stop_worker(worker)
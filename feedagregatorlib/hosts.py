@@ -0,0 +1,163 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Per-host policies for feed fetching
+"""
+import time
+from urllib.parse import urlsplit
+
+
+def url_host(url):
+    """Return the host name of url ('' if there is none)."""
+    return urlsplit(url).hostname or ''
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After threshold consecutive failures, the host circuit opens: requests
+    to the host are refused during a cool-down delay, doubled each time
+    the circuit opens again (from cooldown to max_cooldown seconds). After
+    the cool-down, the circuit is half-open: a single probe request is
+    allowed, its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=3, cooldown=300, max_cooldown=86400):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        # {host: [consecutive failures, times opened, open until, probe start time]}
+        self._hosts = {}
+
+    def state(self, host, now=None):
+        """Return the state of the host circuit."""
+        if host not in self._hosts:
+            return self.CLOSED
+        failures, trips, open_until, probe = self._hosts[host]
+        if not trips:
+            return self.CLOSED
+        if (now or time.time()) < open_until:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_time(self, host):
+        """Return the time after which requests to host may be allowed again (0 if they are)."""
+        state = self.state(host)
+        if state == self.OPEN:
+            return self._hosts[host][2]
+        if state == self.HALF_OPEN and self._hosts[host][3]:
+            # probe in progress
+            return self._hosts[host][3] + self.cooldown
+        return 0
+
+    def failures(self, host):
+        """Return the number of consecutive failures of host."""
+        return self._hosts.get(host, [0])[0]
+
+    def allow(self, host):
+        """Return whether a request to host can be made now."""
+        now = time.time()
+        state = self.state(host, now)
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN:
+            return False
+        host_state = self._hosts[host]
+        # only one probe at a time, unless the probe never came back
+        if now - host_state[3] < self.cooldown:
+            return False
+        host_state[3] = now
+        return True
+
+    def success(self, host):
+        """Record successful request to host."""
+        self._hosts.pop(host, None)
+
+    def failure(self, host):
+        """Record failed request to host."""
+        now = time.time()
+        state = self.state(host, now)
+        host_state = self._hosts.setdefault(host, [0, 0, 0, 0])
+        host_state[0] += 1
+        if ((state == self.CLOSED and host_state[0] >= self.threshold)
+                or state == self.HALF_OPEN):
+            # (re)open the circuit
+            delay = min(self.cooldown * 2 ** host_state[1], self.max_cooldown)
+            host_state[1] += 1
+            host_state[2] = now + delay
+            host_state[3] = 0
+
+    def clear(self):
+        """Close all circuits."""
+        self._hosts.clear()
+
+
+class HostLimiter:
+    """
+    Per-host limits on the requests.
+
+    max_connections: maximum number of simultaneous requests to a host
+    spacing: minimum delay between the start of two requests to a host (s)
+    overrides: {host: (max_connections, spacing)} limits for specific hosts
+    """
+
+    def __init__(self, max_connections=2, spacing=1, overrides=None):
+        self.max_connections = max_connections
+        self.spacing = spacing
+        self.overrides = overrides or {}
+        self._running = {}      # {host: number of running requests}
+        self._last_start = {}   # {host: start time of the last request}
+
+    def limits(self, host):
+        """Return (max_connections, spacing) for host."""
+        return self.overrides.get(host, (self.max_connections, self.spacing))
+
+    def ready_time(self, host, now):
+        """
+        Return when a request to host can be started.
+
+        Return 0 if it can be started now, None if it has to wait for a
+        running request to end, the (monotonic) time otherwise.
+        """
+        max_connections, spacing = self.limits(host)
+        if self._running.get(host, 0) >= max(1, max_connections):
+            return None
+        start = self._last_start.get(host, 0) + spacing
+        return start if start > now else 0
+
+    def start(self, host, now):
+        """Record the start of a request to host."""
+        self._running[host] = self._running.get(host, 0) + 1
+        self._last_start[host] = now
+
+    def done(self, host):
+        """Record the end of a request to host."""
+        if self._running.get(host, 0) > 1:
+            self._running[host] -= 1
+        else:
+            self._running.pop(host, None)
+            # forget the hosts which do not need to be spaced anymore
+            if self._last_start.get(host, 0) + self.limits(host)[1] < time.monotonic():
+                self._last_start.pop(host, None)
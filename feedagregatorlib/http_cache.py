@@ -0,0 +1,352 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+On-disk HTTP cache
+
+The response bodies are stored once per content in objects/<sha256> and
+each cached url has a metadata file meta/<sha1 of url>.json. The files are
+replaced atomically so that the cache can be shared by several processes.
+The freshness of the responses follows RFC 7234 (private cache).
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+# status codes cacheable by default (RFC 7231 section 6.1)
+HEURISTIC_STATUSES = (200, 203, 204, 300, 301, 404, 405, 410, 414, 501)
+MAX_HEURISTIC_LIFETIME = 86400
+VALIDATORS = ('If-None-Match', 'If-Modified-Since')
+
+
+def _http_date(value):
+    """Return the timestamp of the HTTP date (None if invalid)."""
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _cache_control(headers):
+    """Return the Cache-Control directives as a dictionary."""
+    directives = {}
+    for directive in headers.get('cache-control', '').lower().split(','):
+        name, __, value = directive.strip().partition('=')
+        if name:
+            directives[name] = value.strip('"')
+    return directives
+
+
+def freshness_lifetime(meta, heuristic=True):
+    """
+    Return the freshness lifetime (in seconds) of the cached response meta.
+
+    heuristic: whether to estimate the lifetime from Last-Modified when the
+               response has no explicit expiration time
+    """
+    headers = meta['headers']
+    directives = _cache_control(headers)
+    if 'max-age' in directives:
+        try:
+            return int(directives['max-age'])
+        except ValueError:
+            return 0
+    date = _http_date(headers.get('date')) or meta['response_time']
+    if 'expires' in headers:
+        expires = _http_date(headers['expires'])
+        return max(0, expires - date) if expires is not None else 0
+    modified = _http_date(headers.get('last-modified'))
+    if heuristic and modified is not None and meta['status'] in HEURISTIC_STATUSES:
+        # heuristic freshness: 10% of the time since the last modification
+        return min(MAX_HEURISTIC_LIFETIME, max(0, (date - modified) / 10))
+    return 0
+
+
+def current_age(meta, now=None):
+    """Return the current age (in seconds) of the cached response meta."""
+    headers = meta['headers']
+    response_time = meta['response_time']
+    date = _http_date(headers.get('date')) or response_time
+    try:
+        age = int(headers.get('age', 0))
+    except ValueError:
+        age = 0
+    apparent_age = max(0, response_time - date)
+    corrected_age = age + response_time - meta['request_time']
+    return max(apparent_age, corrected_age) + (now or time.time()) - response_time
+
+
+class HTTPCache:
+    """
+    Bounded on-disk HTTP cache in directory.
+
+    When the total size of the stored bodies exceeds max_size (in bytes),
+    the least recently used responses are evicted.
+    """
+
+    def __init__(self, directory, max_size=50 * 1024 ** 2):
+        self.directory = directory
+        self.max_size = max_size
+        self._meta_dir = os.path.join(directory, 'meta')
+        self._objects_dir = os.path.join(directory, 'objects')
+        os.makedirs(self._meta_dir, exist_ok=True)
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(self._objects_dir))
+
+    def _meta_path(self, url):
+        return os.path.join(self._meta_dir, hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+    def _write(self, path, data):
+        """Replace atomically the content of path by data."""
+        tmp = '%s.%i.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url, request_headers=None):
+        """
+        Return (meta, body) of the response cached for url, None if there is none.
+
+        meta is a dictionary with keys 'url', 'final_url', 'status',
+        'headers' (lower case names), 'vary' (request headers selected by
+        the response), 'digest', 'size', 'request_time' and 'response_time'.
+        """
+        path = self._meta_path(url)
+        try:
+            with open(path) as file:
+                meta = json.load(file)
+            with open(os.path.join(self._objects_dir, meta['digest']), 'rb') as file:
+                body = file.read()
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        request_headers = {key.lower(): val for key, val in (request_headers or {}).items()}
+        if any(request_headers.get(name) != val for name, val in meta['vary'].items()):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return meta, body
+
+    def store(self, url, request_headers, status, headers, body, final_url,
+              request_time, response_time):
+        """
+        Store the response to a GET request for url if it is cacheable.
+
+        Return the metadata of the stored response (None if it is not cacheable).
+        """
+        headers = {key.lower(): val for key, val in dict(headers).items()}
+        directives = _cache_control(headers)
+        vary = [name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()]
+        if (status not in HEURISTIC_STATUSES or 'no-store' in directives or '*' in vary
+                or ('max-age' not in directives and 'expires' not in headers
+                    and 'last-modified' not in headers and 'etag' not in headers)):
+            return None
+        request_headers = {key.lower(): val for key, val in (request_headers or {}).items()}
+        digest = hashlib.sha256(body).hexdigest()
+        meta = {'url': url,
+                'final_url': final_url,
+                'status': status,
+                'headers': headers,
+                'vary': {name: request_headers.get(name) for name in vary},
+                'digest': digest,
+                'size': len(body),
+                'request_time': request_time,
+                'response_time': response_time}
+        obj = os.path.join(self._objects_dir, digest)
+        try:
+            if not os.path.exists(obj):
+                self._write(obj, body)
+                self._size += len(body)
+            self._write(self._meta_path(url), json.dumps(meta).encode())
+        except OSError as e:
+            logging.warning('Failed to cache %s: %s', url, e)
+            return None
+        if self._size > self.max_size:
+            self.prune()
+        return meta
+
+    def freshen(self, meta, headers, request_time, response_time):
+        """Update the cached response meta with the headers of a 304 answer and return it."""
+        meta = dict(meta)
+        meta['headers'] = dict(meta['headers'])
+        meta['headers'].update({key.lower(): val for key, val in dict(headers).items()
+                                if key.lower() not in ('content-length', 'content-encoding')})
+        meta['request_time'] = request_time
+        meta['response_time'] = response_time
+        try:
+            self._write(self._meta_path(meta['url']), json.dumps(meta).encode())
+        except OSError as e:
+            logging.warning('Failed to update cache for %s: %s', meta['url'], e)
+        return meta
+
+    def prune(self, max_size=None):
+        """Evict the least recently used responses until the cache size is below 90% of max_size."""
+        target = 0.9 * (self.max_size if max_size is None else max_size)
+        entries = []
+        refs = {}
+        for entry in os.scandir(self._meta_dir):
+            try:
+                with open(entry.path) as file:
+                    digest = json.load(file)['digest']
+                entries.append((entry.stat().st_mtime, entry.path, digest))
+            except (OSError, ValueError, KeyError):
+                continue
+            refs[digest] = refs.get(digest, 0) + 1
+        sizes = {}
+        recent = time.time() - 60
+        for entry in os.scandir(self._objects_dir):
+            stat = entry.stat()
+            if entry.name in refs:
+                sizes[entry.name] = stat.st_size
+            elif stat.st_mtime < recent:
+                # orphan object (recent ones may belong to a response being stored)
+                os.remove(entry.path)
+        self._size = sum(sizes.values())
+        entries.sort()
+        for mtime, path, digest in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            refs[digest] -= 1
+            if not refs[digest] and digest in sizes:
+                try:
+                    os.remove(os.path.join(self._objects_dir, digest))
+                except FileNotFoundError:
+                    pass
+                self._size -= sizes[digest]
+
+
+def cached_response(meta, body, request_headers):
+    """
+    Return (status, headers, body, final_url) answering the request from cache.
+
+    The answer is 304 if the validators of the request match the cached
+    response. An Age header is added (RFC 7234 section 4).
+    """
+    headers = dict(meta['headers'])
+    headers['age'] = str(int(current_age(meta)))
+    etag = headers.get('etag')
+    modified = headers.get('last-modified')
+    if ((etag and request_headers.get('If-None-Match') == etag)
+            or (modified and request_headers.get('If-Modified-Since') == modified)):
+        return 304, headers, b'', meta['final_url']
+    return meta['status'], headers, body, meta['final_url']
+
+
+def _validators(meta):
+    """Return the request headers to revalidate the cached response meta."""
+    headers = {}
+    if 'etag' in meta['headers']:
+        headers['If-None-Match'] = meta['headers']['etag']
+    if 'last-modified' in meta['headers']:
+        headers['If-Modified-Since'] = meta['headers']['last-modified']
+    return headers
+
+
+class CachingBackend:
+    """
+    Fetch backend answering from cache when possible.
+
+    Fresh cached responses are returned without network access, stale ones
+    are revalidated with a conditional request. On a cache miss, the
+    validators of the request are dropped so that the full response can be
+    cached.
+
+    Only an explicit expiration time (max-age or Expires) makes a response
+    fresh: the feeds are refreshed when the scheduler decides it, so the
+    heuristic freshness is not used.
+    """
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    @property
+    def read_timeout(self):
+        return self.backend.read_timeout
+
+    def handles(self, url):
+        return self.backend.handles(url)
+
+    def request(self, url, headers=None, max_redirections=10):
+        headers = headers or {}
+        request_headers = {key: val for key, val in headers.items() if key not in VALIDATORS}
+        cached = self.cache.lookup(url, request_headers)
+        if cached is not None:
+            meta, body = cached
+            directives = _cache_control(meta['headers'])
+            if ('no-cache' not in directives
+                    and current_age(meta) < freshness_lifetime(meta, heuristic=False)):
+                return cached_response(meta, body, headers)
+            request_headers.update(_validators(meta))
+        request_time = time.time()
+        status, msg, body, final_url = self.backend.request(url, request_headers, max_redirections)
+        response_time = time.time()
+        if status == 304 and cached is not None:
+            meta = self.cache.freshen(cached[0], msg, request_time, response_time)
+            return cached_response(meta, cached[1], headers)
+        self.cache.store(url, request_headers, status, msg, body, final_url,
+                         request_time, response_time)
+        return status, msg, body, final_url
+
+    def close_idle(self):
+        self.backend.close_idle()
+
+    def close(self):
+        self.backend.close()
+
+
+def cached_urlopen(url, cache, timeout=None):
+    """Return the body of the response to a GET request for url, using cache (if not None)."""
+    if cache is None:
+        with urlopen(url, timeout=timeout) as response:
+            return response.read()
+    cached = cache.lookup(url)
+    if cached is not None:
+        meta, body = cached
+        if ('no-cache' not in _cache_control(meta['headers'])
+                and current_age(meta) < freshness_lifetime(meta)):
+            return body
+        request = Request(url, headers=_validators(meta))
+    else:
+        request = Request(url)
+    request_time = time.time()
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            status = response.getcode()
+            headers = response.headers
+            data = response.read()
+            final_url = response.geturl()
+    except HTTPError as e:
+        if e.code == 304 and cached is not None:
+            cache.freshen(cached[0], e.headers, request_time, time.time())
+            return cached[1]
+        raise
+    cache.store(url, {}, status, headers, data, final_url, request_time, time.time())
+    return data
@@ -0,0 +1,59 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Feed import progress dialog
+"""
+from tkinter import Toplevel
+from tkinter.ttk import Label, Button, Progressbar
+
+from feedagregatorlib.constants import APP_NAME
+
+
+class ImportProgress(Toplevel):
+    """Display the progress of the import of total feeds, cancel calls cancel."""
+
+    def __init__(self, master, total, cancel):
+        Toplevel.__init__(self, master, class_=APP_NAME, padx=6, pady=6)
+        self.title(_("Import Feeds"))
+        self.resizable(True, False)
+        self.columnconfigure(0, weight=1)
+        self.protocol('WM_DELETE_WINDOW', cancel)
+        self.total = total
+        self.done = 0
+        self.errors = 0
+
+        self.label = Label(self)
+        self.label.grid(row=0, column=0, sticky='w', pady=4, padx=4)
+        self.progressbar = Progressbar(self, orient='horizontal', length=300,
+                                       mode='determinate', maximum=total)
+        self.progressbar.grid(row=1, column=0, sticky='ew', pady=4, padx=4)
+        Button(self, text=_('Cancel'), command=cancel).grid(row=2, column=0, pady=4, padx=4)
+        self._update_label()
+
+    def _update_label(self):
+        self.label.configure(text=_('Fetched {done} / {total} feeds ({errors} errors)').format(
+            done=self.done, total=self.total, errors=self.errors))
+
+    def step(self, error=False):
+        """Record that one more feed was fetched."""
+        self.done += 1
+        self.errors += error
+        self.progressbar.configure(value=self.done)
+        self._update_label()
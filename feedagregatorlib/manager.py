@@ -20,17 +20,22 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Feed manager dialog
 """
+import logging
+import time
 from tkinter import Toplevel
-from tkinter.ttk import Entry, Button, Treeview
+from tkinter.filedialog import asksaveasfilename
+from tkinter.ttk import Entry, Button, Treeview, Frame
 
 from PIL.ImageTk import PhotoImage
 
 from feedagregatorlib.constants import FEEDS, IM_MOINS, IM_PLUS, \
     IM_MOINS_SEL, IM_MOINS_CLICKED, APP_NAME, LATESTS, CONFIG
 from feedagregatorlib.add import Add
-from feedagregatorlib.messagebox import askokcancel
+from feedagregatorlib.messagebox import askokcancel, showerror
 from feedagregatorlib.autoscrollbar import AutoScrollbar
 from feedagregatorlib.autocomplete import AutoCompleteCombobox
+from feedagregatorlib.hosts import url_host
+from feedagregatorlib.opml import export_opml
 
 
 class Manager(Toplevel):
@@ -54,7 +59,7 @@ class Manager(Toplevel):
         self.categories.add('')
 
         # --- treeview
-        self.tree = Treeview(self, columns=('Title', 'URL', 'Category', 'Remove'),
+        self.tree = Treeview(self, columns=('Title', 'URL', 'Category', 'Server', 'Remove'),
                              style='manager.Treeview',
                              selectmode='none')
         self.tree.heading('Title', text=_('Title'),
@@ -63,10 +68,13 @@ class Manager(Toplevel):
                           command=lambda: self._sort_column('URL', False))
         self.tree.heading('Category', text=_('Category'),
                           command=lambda: self._sort_column('Category', False))
+        self.tree.heading('Server', text=_('Server'),
+                          command=lambda: self._sort_column('Server', False))
         self.tree.column('#0', width=6)
         self.tree.column('Title', width=250)
         self.tree.column('URL', width=350)
         self.tree.column('Category', width=150)
+        self.tree.column('Server', width=150)
         self.tree.column('Remove', width=20, minwidth=20, stretch=False)
 
         y_scroll = AutoScrollbar(self, orient='vertical',
@@ -85,6 +93,7 @@ class Manager(Toplevel):
             item = self.tree.insert('', 'end',
                                     values=(title, FEEDS.get(title, 'url'),
                                             FEEDS.get(title, 'category', fallback=''),
+                                            self._server_state(FEEDS.get(title, 'url')),
                                             ''))
             if FEEDS.getboolean(title, 'active', fallback=True):
                 self.tree.selection_add(item)
@@ -100,17 +109,27 @@ class Manager(Toplevel):
         self.tree.grid(row=0, column=0, sticky='ewsn')
         x_scroll.grid(row=1, column=0, sticky='ew')
         y_scroll.grid(row=0, column=1, sticky='ns')
+        frame = Frame(self)
+        frame.grid(row=2, column=0, sticky='w')
+        Button(frame, text=_('Import'), command=self.feed_import).pack(side='left', padx=4, pady=4)
+        Button(frame, text=_('Export'), command=self.feed_export).pack(side='left', padx=4, pady=4)
         Button(self, image=self.im_plus, command=self.feed_add,
                style='manager.TButton').grid(row=2, column=0, columnspan=2,
                                              sticky='e', padx=4, pady=4)
-        self._check_add_id = ''
 
-    def destroy(self):
-        try:
-            self.after_cancel(self._check_add_id)
-        except ValueError:
-            pass
-        Toplevel.destroy(self)
+    def _server_state(self, url):
+        """Return the state of the circuit breaker of the feed's server for display."""
+        breaker = self.master.breaker
+        host = url_host(url)
+        state = breaker.state(host)
+        if state == breaker.OPEN:
+            retry = time.strftime('%H:%M', time.localtime(breaker.retry_time(host)))
+            return _('Suspended until {time}').format(time=retry)
+        elif state == breaker.HALF_OPEN:
+            return _('Retrying')
+        elif breaker.failures(host):
+            return _('{nb} failure(s)').format(nb=breaker.failures(host))
+        return _('OK')
 
     def _edit(self, event, item):
         """Edit feed title."""
@@ -173,13 +192,13 @@ class Manager(Toplevel):
             combo.current(cat.index(self.tree.set(item, '#3')))
 
     def _press(self, event, item):
-        if self.tree.identify_column(event.x) == '#4':
+        if self.tree.identify_column(event.x) == '#5':
             self.tree.tag_configure(item, image=self.im_moins_clicked)
 
     def _click_release(self, event, item):
         """Handle click on items."""
         if self.tree.identify_row(event.y) == item:
-            if self.tree.identify_column(event.x) == '#4':
+            if self.tree.identify_column(event.x) == '#5':
                 title = self.tree.item(item, 'values')[0]
                 rep = True
                 if CONFIG.getboolean('General', 'confirm_remove', fallback=True):
@@ -210,7 +229,7 @@ class Manager(Toplevel):
         """Highlight minus icon under the mouse."""
         if self._last_active_item is not None:
             self.tree.tag_configure(self._last_active_item, image=self.im_moins)
-        if self.tree.identify_column(event.x) == '#4':
+        if self.tree.identify_column(event.x) == '#5':
             item = self.tree.identify_row(event.y)
             if item:
                 self.tree.tag_configure(item, image=self.im_moins_sel)
@@ -235,28 +254,60 @@ class Manager(Toplevel):
         url = dialog.url
         if url:
             self.configure(cursor='watch')
-            queue = self.master.feed_add(url, manager=True)
-            self._check_add_id = self.after(1000, self._check_add_finished, url, queue)
-
-    def _check_add_finished(self, url, queue):
-
-        if queue.empty():
-            self._check_add_id = self.after(1000, self._check_add_finished, url, queue)
-        else:
-            title = queue.get(False)
+            self.master.feed_add(url, self._feed_added)
+
+    def feed_import(self):
+        self.grab_release()
+        self.configure(cursor='watch')
+        self.master.feed_import(callback=self._feeds_imported)
+
+    def feed_export(self):
+        filename = asksaveasfilename(parent=self, title=_('Export Feeds'),
+                                     defaultextension='.opml', initialfile='feeds.opml',
+                                     filetypes=[(_('OPML files'), '*.opml'),
+                                                (_('All files'), '*')])
+        if filename:
+            try:
+                export_opml(filename)
+            except OSError as e:
+                logging.error('Failed to export the feeds to %s: %s', filename, e)
+                showerror(_('Error'), _('Failed to export the feeds to {file}.').format(file=filename),
+                          parent=self)
+            else:
+                logging.info('Feeds exported to %s', filename)
+
+    def _insert_feed(self, title, url, category, active=True):
+        """Insert new feed in the treeview."""
+        item = self.tree.insert('', 'end', values=(title, url, category, self._server_state(url)))
+        self.tree.item(item, tags=item)
+        self.tree.tag_configure(item, image=self.im_moins)
+        self.tree.tag_bind(item, '<ButtonRelease-1>',
+                           lambda event: self._click_release(event, item))
+        self.tree.tag_bind(item, '<ButtonPress-1>',
+                           lambda event: self._press(event, item))
+        self.tree.tag_bind(item, '<Double-1>',
+                           lambda event: self._edit(event, item))
+        if active:
+            self.tree.selection_add(item)
+        self.categories.add(category)
+        self.change_made = True
+
+    def _feed_added(self, title):
+        """Display newly added feed."""
+        if self.winfo_exists():
             if title:
-                item = self.tree.insert('', 'end', values=(title, url, ''))
-                self.tree.item(item, tags=item)
-                self.tree.tag_configure(item, image=self.im_moins)
-                self.tree.tag_bind(item, '<ButtonRelease-1>',
-                                   lambda event: self._click_release(event, item))
-                self.tree.tag_bind(item, '<ButtonPress-1>',
-                                   lambda event: self._press(event, item))
-                self.tree.tag_bind(item, '<Double-1>',
-                                   lambda event: self._edit(event, item))
-                self.tree.selection_add(item)
+                self._insert_feed(title, FEEDS.get(title, 'url'), '')
+            self.configure(cursor='arrow')
+            self.focus_set()
+            self.grab_set()
 
-                self.change_made = True
+    def _feeds_imported(self, titles):
+        """Display imported feeds."""
+        if self.winfo_exists():
+            for title in titles:
+                self._insert_feed(title, FEEDS.get(title, 'url'),
+                                  FEEDS.get(title, 'category', fallback=''),
+                                  FEEDS.getboolean(title, 'active', fallback=True))
             self.configure(cursor='arrow')
             self.focus_set()
             self.grab_set()
@@ -0,0 +1,125 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+OPML feed lists
+"""
+import os
+import sys
+from email.utils import formatdate
+from itertools import groupby
+from xml.etree.ElementTree import iterparse, ParseError
+from xml.sax.saxutils import escape, quoteattr
+
+from feedagregatorlib.constants import FEEDS, APP_NAME
+
+
+# namespace of the FeedAgregator specific attributes
+NAMESPACE = 'https://github.com/j4321/FeedAgregator'
+
+
+def read_opml(filename):
+    """
+    Return the list of (title, url, category, active) of the feeds in the OPML file.
+
+    The category of a feed is the title of the outline containing it ('' if
+    it is at the top level). The feeds are active unless marked otherwise
+    by write_opml. The duplicated urls are skipped.
+
+    Raise ValueError if the file is not a valid OPML file.
+    """
+    feeds = []
+    urls = set()
+    categories = []   # stack of the titles of the enclosing outlines ('' for feeds)
+    try:
+        for event, elem in iterparse(filename, events=('start', 'end')):
+            if elem.tag != 'outline':
+                continue
+            if event == 'start':
+                url = elem.get('xmlUrl', '').strip()
+                title = elem.get('title') or elem.get('text') or ''
+                if url:
+                    if url not in urls:
+                        urls.add(url)
+                        category = next((cat for cat in reversed(categories) if cat), '')
+                        active = elem.get('{%s}active' % NAMESPACE, 'true') != 'false'
+                        feeds.append((title.strip(), url, category, active))
+                    categories.append('')
+                else:
+                    categories.append(title.strip())
+            else:
+                categories.pop()
+                elem.clear()
+    except ParseError as e:
+        raise ValueError(str(e))
+    return feeds
+
+
+def write_opml(file, feeds, title=''):
+    """
+    Write the feeds in OPML 2.0 format to the file object.
+
+    feeds: iterable of (title, url, category, active), sorted by category.
+           The feeds of each category are grouped in an outline, the
+           inactive feeds are marked with feedagregator:active="false".
+
+    The document is written feed by feed so that the memory used does not
+    depend on the number of feeds.
+    """
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<opml version="2.0" xmlns:feedagregator=%s>\n'
+               '  <head>\n'
+               '    <title>%s</title>\n'
+               '    <dateCreated>%s</dateCreated>\n'
+               '  </head>\n'
+               '  <body>\n' % (quoteattr(NAMESPACE), escape(title), formatdate()))
+    for category, group in groupby(feeds, key=lambda feed: feed[2]):
+        indent = '    '
+        if category:
+            file.write('    <outline text=%s title=%s>\n' % (quoteattr(category),
+                                                             quoteattr(category)))
+            indent = '      '
+        for feed_title, url, __, active in group:
+            file.write('%s<outline type="rss" text=%s title=%s xmlUrl=%s%s%s/>\n'
+                       % (indent, quoteattr(feed_title), quoteattr(feed_title), quoteattr(url),
+                          ' category=%s' % quoteattr('/' + category) if category else '',
+                          '' if active else ' feedagregator:active="false"'))
+        if category:
+            file.write('    </outline>\n')
+    file.write('  </body>\n</opml>\n')
+
+
+def export_opml(filename):
+    """
+    Export the feeds to the OPML file filename ('-' for the standard output).
+
+    The file is written to a temporary file first, then renamed, so that
+    an existing file is not left truncated if the export fails.
+    """
+    titles = sorted(FEEDS.sections(),
+                    key=lambda title: (FEEDS.get(title, 'category', fallback=''), title.lower()))
+    feeds = ((title, FEEDS.get(title, 'url'), FEEDS.get(title, 'category', fallback=''),
+              FEEDS.getboolean(title, 'active', fallback=True)) for title in titles)
+    if filename == '-':
+        write_opml(sys.stdout, feeds, APP_NAME)
+        return
+    tmp = filename + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as file:
+        write_opml(file, feeds, APP_NAME)
+    os.replace(tmp, filename)
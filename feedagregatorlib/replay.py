@@ -0,0 +1,228 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Fetch backends recording the HTTP responses to a fixture directory and
+replaying them offline, for testing and benchmarking
+
+A fixture is made of two files named after the SHA-1 of the requested url:
+
+    <sha1>.json: {"url": requested url, "final_url": url after redirections,
+                  "status": HTTP status, "headers": {name: value},
+                  "elapsed": duration of the request (s)}
+    <sha1>.body: raw response body
+
+The status and headers can be edited by hand to simulate server behaviours.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import time
+
+
+def fixture_name(url):
+    """Return the base name of the fixture files for url."""
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+class RecordingBackend:
+    """Fetch backend saving the responses of backend in directory."""
+
+    def __init__(self, backend, directory):
+        self.backend = backend
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def read_timeout(self):
+        return self.backend.read_timeout
+
+    def handles(self, url):
+        return self.backend.handles(url)
+
+    def request(self, url, headers=None, max_redirections=10):
+        # record full responses, not 304 answers to conditional requests
+        headers = {key: val for key, val in (headers or {}).items()
+                   if key not in ('If-None-Match', 'If-Modified-Since')}
+        start = time.monotonic()
+        status, msg, body, final_url = self.backend.request(url, headers, max_redirections)
+        fixture = {'url': url,
+                   'final_url': final_url,
+                   'status': status,
+                   'headers': dict(msg.items()),
+                   'elapsed': time.monotonic() - start}
+        path = os.path.join(self.directory, fixture_name(url))
+        with open(path + '.body', 'wb') as file:
+            file.write(body)
+        with open(path + '.json', 'w') as file:
+            json.dump(fixture, file, indent=1)
+        return status, msg, body, final_url
+
+    def close_idle(self):
+        self.backend.close_idle()
+
+    def close(self):
+        self.backend.close()
+
+
+class ReplayBackend:
+    """
+    Fetch backend replaying the responses recorded in directory.
+
+    Requests for unrecorded urls get a 404 answer. Conditional requests get
+    a 304 answer if the validators match the recorded ones, unless
+    conditional is False.
+
+    latency: delay before answering (s), 'recorded' to use the recorded
+             duration of the requests
+    jitter: maximum random variation of the latency (ratio)
+    failure_rate: fraction of the requests failing with a connection error
+    timeout_rate: fraction of the requests failing with a timeout
+    status: HTTP status replacing the recorded one for a fraction
+            status_rate of the requests (e.g. 503 to simulate overloaded
+            servers)
+    seed: seed of the random generator, for reproducible runs
+    counters: directory where the number of requests for each url is
+              counted, to share it between the processes replaying the
+              same run (None to count them in this process only)
+
+    With a seed, the random draws of a request only depend on the seed,
+    the url and the number of previous requests for the url, so that they
+    do not depend on the process serving the request.
+    """
+
+    def __init__(self, directory, latency=0, jitter=0, failure_rate=0, timeout_rate=0,
+                 status=None, status_rate=1, conditional=True, seed=None, read_timeout=None,
+                 counters=None):
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.status = status
+        self.status_rate = status_rate
+        self.conditional = conditional
+        self.read_timeout = read_timeout
+        self.seed = seed
+        self.counters = counters
+        self._counts = {}
+        self._random = random.Random()
+
+    def handles(self, url):
+        return True
+
+    def _load(self, url):
+        """Return (fixture, body) for url, None if there is no fixture."""
+        path = os.path.join(self.directory, fixture_name(url))
+        try:
+            with open(path + '.json') as file:
+                fixture = json.load(file)
+            with open(path + '.body', 'rb') as file:
+                body = file.read()
+        except FileNotFoundError:
+            return None
+        return fixture, body
+
+    def _count(self, url):
+        """Return the number of previous requests for url and count this one."""
+        if self.counters is None:
+            count = self._counts.get(url, 0)
+            self._counts[url] = count + 1
+            return count
+        # one byte is appended to the counter file for each request
+        with open(os.path.join(self.counters, fixture_name(url)), 'a+') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            file.seek(0)
+            count = len(file.read())
+            file.write('.')
+        return count
+
+    def _request_random(self, url):
+        """Return the random generator for the draws of the next request for url."""
+        if self.seed is None:
+            return self._random
+        return random.Random('{} {} {}'.format(self.seed, url, self._count(url)))
+
+    def _wait(self, fixture, rand):
+        if self.latency == 'recorded':
+            delay = fixture.get('elapsed', 0) if fixture else 0
+        else:
+            delay = self.latency
+        delay *= 1 + self.jitter * rand.uniform(-1, 1)
+        if self.read_timeout is not None and delay > self.read_timeout:
+            time.sleep(self.read_timeout)
+            raise socket.timeout('timed out')
+        time.sleep(max(0, delay))
+
+    def request(self, url, headers=None, max_redirections=10):
+        headers = headers or {}
+        loaded = self._load(url)
+        fixture, body = loaded if loaded else (None, b'')
+        rand = self._request_random(url)
+        self._wait(fixture, rand)
+        draw = rand.random()
+        if draw < self.failure_rate:
+            raise ConnectionResetError('Simulated connection failure')
+        if draw < self.failure_rate + self.timeout_rate:
+            raise socket.timeout('Simulated timeout')
+        if fixture is None:
+            logging.warning('No fixture for %s', url)
+            return 404, {}, b'', url
+        msg = fixture['headers']
+        names = {key.lower(): key for key in msg}
+        etag = msg.get(names.get('etag'), '')
+        modified = msg.get(names.get('last-modified'), '')
+        if self.status is not None and rand.random() < self.status_rate:
+            return self.status, msg, b'', fixture['final_url']
+        if (self.conditional and fixture['status'] == 200
+                and ((etag and headers.get('If-None-Match') == etag)
+                     or (modified and headers.get('If-Modified-Since') == modified))):
+            return 304, msg, b'', fixture['final_url']
+        return fixture['status'], msg, body, fixture['final_url']
+
+    def close_idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_backend(pool, options=None):
+    """
+    Return the fetch backend described by options.
+
+    pool: ConnectionPool used to access the network
+    options: None to use the network or dictionary with keys 'mode'
+             ('record' or 'replay'), 'directory' and the ReplayBackend
+             options
+    """
+    if not options:
+        return pool
+    options = dict(options)
+    mode = options.pop('mode')
+    directory = os.path.expanduser(options.pop('directory'))
+    if mode == 'record':
+        return RecordingBackend(pool, directory)
+    if mode == 'replay':
+        return ReplayBackend(directory, read_timeout=pool.read_timeout, **options)
+    raise ValueError('Unknown fetch backend: %s' % mode)
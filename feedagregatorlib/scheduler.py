@@ -0,0 +1,153 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Per-feed refresh scheduler
+"""
+import heapq
+import random
+import time
+import zlib
+from statistics import median
+
+
+HINT_MAX_DELAY = 7 * 86400  # longest refresh delay accepted from feed/server hints (s)
+
+
+def publishing_period(timestamps, nb_max=20):
+    """
+    Estimate the publishing period of a feed (in seconds).
+
+    timestamps: dates of the feed entries
+    nb_max: number of latest entries taken into account
+
+    Return None if there are not enough entries to estimate the period.
+    """
+    timestamps = sorted(timestamps, reverse=True)[:nb_max]
+    gaps = [t1 - t2 for t1, t2 in zip(timestamps, timestamps[1:]) if t1 > t2]
+    if not gaps:
+        return None
+    return median(gaps)
+
+
+def adapt_interval(interval, period, new_entries, min_delay, max_delay):
+    """
+    Return the next refresh interval of a feed.
+
+    interval: current refresh interval
+    period: estimated publishing period of the feed (None if unknown)
+    new_entries: whether new entries were found in the last refresh
+
+    When new entries are found, the feed is polled twice per publishing
+    period, otherwise the interval is doubled. The result is kept between
+    min_delay and max_delay.
+    """
+    if new_entries:
+        if period:
+            interval = period / 2
+    else:
+        interval *= 2
+    return min(max(interval, min_delay), max_delay)
+
+
+def feed_offset(url):
+    """
+    Return a deterministic pseudo-random number in [0, 1) for the feed.
+
+    It is used to spread the refreshes of the feeds evenly over time, the
+    same feed always getting the same offset.
+    """
+    return zlib.crc32(url.encode()) / 2 ** 32
+
+
+def jitter(delay, ratio):
+    """Return delay randomly increased or decreased by at most ratio * delay."""
+    return delay * (1 + random.uniform(-ratio, ratio))
+
+
+def skip_forward(due, skip_hours=(), skip_days=()):
+    """
+    Postpone due (timestamp) until it is outside the skipped hours and days.
+
+    skip_hours: hours (GMT) during which the feed should not be refreshed
+    skip_days: days (0 = Monday) during which the feed should not be refreshed
+    """
+    if len(set(skip_hours)) >= 24 or len(set(skip_days)) >= 7:
+        # the feed is never supposed to be refreshed, ignore the hints
+        return due
+    while True:
+        t = time.gmtime(due)
+        if t.tm_hour not in skip_hours and t.tm_wday not in skip_days:
+            return due
+        due = (due // 3600 + 1) * 3600  # beginning of next hour
+
+
+class RefreshScheduler:
+    """
+    Keep track of the next refresh time of each feed.
+
+    The due times are stored in a heap so that the next feed to refresh is
+    always available in constant time, obsolete heap items (feed removed
+    or rescheduled) are discarded lazily.
+    """
+
+    def __init__(self):
+        self._heap = []     # [(due, title)]
+        self._due = {}      # {title: due}
+
+    def __contains__(self, title):
+        return title in self._due
+
+    def schedule(self, title, due):
+        """Schedule refresh of feed title at time due (timestamp)."""
+        self._due[title] = due
+        heapq.heappush(self._heap, (due, title))
+
+    def remove(self, title):
+        """Unschedule feed."""
+        self._due.pop(title, None)
+
+    def rename(self, old_name, new_name):
+        if old_name in self._due:
+            self.schedule(new_name, self._due.pop(old_name))
+
+    def clear(self):
+        self._heap.clear()
+        self._due.clear()
+
+    def _clean(self):
+        """Discard obsolete items at the top of the heap."""
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Return the time of the next refresh (None if no feed is scheduled)."""
+        self._clean()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Unschedule and return the list of feeds due at time now."""
+        titles = []
+        self._clean()
+        while self._heap and self._heap[0][0] <= now:
+            due, title = heapq.heappop(self._heap)
+            del self._due[title]
+            titles.append(title)
+            self._clean()
+        return titles
@@ -43,7 +43,7 @@ class Config(Toplevel):
         self.columnconfigure(1, weight=1)
         self.rowconfigure(0, weight=1)
         self.resizable(True, True)
-        self.minsize(470, 574)
+        self.minsize(470, 676)
 
         style = Style(self)
         self._bg = style.lookup('TFrame', 'background')
@@ -57,6 +57,7 @@ class Config(Toplevel):
         self.gui = StringVar(self, CONFIG.get("General", "trayicon").capitalize())
 
         self._init_general()
+        self._init_network()
         self._init_widget()
 
         self.notebook.grid(sticky='ewsn', row=0, column=0, columnspan=2)
@@ -110,20 +111,75 @@ class Config(Toplevel):
                                  validatecommand=(self._validate, '%P'))
         self.entry_delay.grid(row=4, column=1, padx=8, pady=4, sticky='w')
         self.entry_delay.insert(0, CONFIG.getint('General', 'update_delay') // 60000)
+        Label(frame_general,
+              text=_("Minimum feed update delay (min)")).grid(row=5, column=0,
+                                                              padx=8, pady=4,
+                                                              sticky="e")
+        self.entry_min_delay = Entry(frame_general, width=10, justify='center',
+                                     validate='key',
+                                     validatecommand=(self._validate, '%P'))
+        self.entry_min_delay.grid(row=5, column=1, padx=8, pady=4, sticky='w')
+        self.entry_min_delay.insert(0, CONFIG.getint('General', 'min_update_delay', fallback=600000) // 60000)
+        Label(frame_general,
+              text=_("Maximum feed update delay (min)")).grid(row=6, column=0,
+                                                              padx=8, pady=4,
+                                                              sticky="e")
+        self.entry_max_delay = Entry(frame_general, width=10, justify='center',
+                                     validate='key',
+                                     validatecommand=(self._validate, '%P'))
+        self.entry_max_delay.grid(row=6, column=1, padx=8, pady=4, sticky='w')
+        self.entry_max_delay.insert(0, CONFIG.getint('General', 'max_update_delay', fallback=86400000) // 60000)
+        Label(frame_general,
+              text=_("Random variation of the update delays (%)")).grid(row=7, column=0,
+                                                                       padx=8, pady=4,
+                                                                       sticky="e")
+        self.entry_jitter = Entry(frame_general, width=10, justify='center',
+                                  validate='key',
+                                  validatecommand=(self._validate, '%P'))
+        self.entry_jitter.grid(row=7, column=1, padx=8, pady=4, sticky='w')
+        self.entry_jitter.insert(0, CONFIG.getint('General', 'update_jitter', fallback=10))
         # --- image loading timeout
         Label(frame_general,
-              text=_("Image loading timeout (s)")).grid(row=5, column=0,
+              text=_("Image loading timeout (s)")).grid(row=8, column=0,
                                                         padx=8, pady=4,
                                                         sticky="e")
         self.entry_timeout = Entry(frame_general, width=10, justify='center',
                                    validate='key',
                                    validatecommand=(self._validate, '%P'))
-        self.entry_timeout.grid(row=5, column=1, padx=8, pady=4, sticky='w')
+        self.entry_timeout.grid(row=8, column=1, padx=8, pady=4, sticky='w')
         self.entry_timeout.insert(0, CONFIG.getint('General', 'img_timeout', fallback=10))
+        # --- entry retention
+        Label(frame_general,
+              text=_("Maximum number of entries per feed (0 for no limit)")).grid(row=9, column=0,
+                                                                                 padx=8, pady=4,
+                                                                                 sticky="e")
+        self.entry_max_entries = Entry(frame_general, width=10, justify='center',
+                                       validate='key',
+                                       validatecommand=(self._validate, '%P'))
+        self.entry_max_entries.grid(row=9, column=1, padx=8, pady=4, sticky='w')
+        self.entry_max_entries.insert(0, CONFIG.getint('General', 'max_entries', fallback=500))
+        Label(frame_general,
+              text=_("Maximum age of the entries (days, 0 for no limit)")).grid(row=10, column=0,
+                                                                               padx=8, pady=4,
+                                                                               sticky="e")
+        self.entry_max_entry_age = Entry(frame_general, width=10, justify='center',
+                                         validate='key',
+                                         validatecommand=(self._validate, '%P'))
+        self.entry_max_entry_age.grid(row=10, column=1, padx=8, pady=4, sticky='w')
+        self.entry_max_entry_age.insert(0, CONFIG.getint('General', 'max_entry_age', fallback=0))
+        Label(frame_general,
+              text=_("Maximum size of the entries of a feed (kB, 0 for no limit)")).grid(row=11, column=0,
+                                                                                        padx=8, pady=4,
+                                                                                        sticky="e")
+        self.entry_max_feed_size = Entry(frame_general, width=10, justify='center',
+                                         validate='key',
+                                         validatecommand=(self._validate, '%P'))
+        self.entry_max_feed_size.grid(row=11, column=1, padx=8, pady=4, sticky='w')
+        self.entry_max_feed_size.insert(0, CONFIG.getint('General', 'max_feed_size', fallback=0))
         # --- Notifications
         self.notifications = Checkbutton(frame_general,
                                          text=_("Activate notifications"))
-        self.notifications.grid(row=6, column=0, padx=8, pady=4, columnspan=2, sticky='w')
+        self.notifications.grid(row=12, column=0, padx=8, pady=4, columnspan=2, sticky='w')
         if CONFIG.getboolean('General', 'notifications', fallback=True):
             self.notifications.state(('selected', '!alternate'))
         else:
@@ -132,7 +188,7 @@ class Config(Toplevel):
         # --- Confirm remove feed
         self.confirm_feed_rem = Checkbutton(frame_general,
                                             text=_("Show confirmation dialog before removing feed"))
-        self.confirm_feed_rem.grid(row=7, column=0, padx=8, pady=4, columnspan=2, sticky='w')
+        self.confirm_feed_rem.grid(row=13, column=0, padx=8, pady=4, columnspan=2, sticky='w')
         if CONFIG.getboolean('General', 'confirm_feed_remove', fallback=True):
             self.confirm_feed_rem.state(('selected', '!alternate'))
         else:
@@ -140,7 +196,7 @@ class Config(Toplevel):
         # --- Confirm remove cat
         self.confirm_cat_rem = Checkbutton(frame_general,
                                            text=_("Show confirmation dialog before removing category"))
-        self.confirm_cat_rem.grid(row=8, column=0, padx=8, pady=4, columnspan=2, sticky='w')
+        self.confirm_cat_rem.grid(row=14, column=0, padx=8, pady=4, columnspan=2, sticky='w')
         if CONFIG.getboolean('General', 'confirm_cat_remove', fallback=True):
             self.confirm_cat_rem.state(('selected', '!alternate'))
         else:
@@ -148,7 +204,7 @@ class Config(Toplevel):
         # --- Confirm update
         self.confirm_update = Checkbutton(frame_general,
                                           text=_("Check for updates on start-up"))
-        self.confirm_update.grid(row=9, column=0, padx=8, pady=4, columnspan=2, sticky='w')
+        self.confirm_update.grid(row=15, column=0, padx=8, pady=4, columnspan=2, sticky='w')
         if CONFIG.getboolean('General', 'check_update', fallback=True):
             self.confirm_update.state(('selected', '!alternate'))
         else:
@@ -157,12 +213,104 @@ class Config(Toplevel):
         # --- Splash supported
         self.splash_support = Checkbutton(frame_general,
                                           text=_("Check this box if the widgets disappear when you click"))
-        self.splash_support.grid(row=10, column=0, padx=8, pady=4, columnspan=2, sticky='w')
+        self.splash_support.grid(row=16, column=0, padx=8, pady=4, columnspan=2, sticky='w')
         if not CONFIG.getboolean('General', 'splash_supported', fallback=True):
             self.splash_support.state(('selected', '!alternate'))
         else:
             self.splash_support.state(('!selected', '!alternate'))
 
+    def _init_network(self):
+        frame_network = Frame(self)
+        self.notebook.add(frame_network, text=_("Network"))
+        # --- number of fetch workers
+        Label(frame_network,
+              text=_("Maximum number of simultaneous feed downloads")).grid(row=0, column=0,
+                                                                          padx=8, pady=4,
+                                                                          sticky="e")
+        self.entry_workers = Entry(frame_network, width=10, justify='center',
+                                   validate='key',
+                                   validatecommand=(self._validate, '%P'))
+        self.entry_workers.grid(row=0, column=1, padx=8, pady=4, sticky='w')
+        self.entry_workers.insert(0, CONFIG.getint('General', 'fetch_workers', fallback=4))
+        # --- connection pool
+        Label(frame_network,
+              text=_("Persistent connections per server")).grid(row=1, column=0,
+                                                              padx=8, pady=4,
+                                                              sticky="e")
+        self.entry_pool_size = Entry(frame_network, width=10, justify='center',
+                                     validate='key',
+                                     validatecommand=(self._validate, '%P'))
+        self.entry_pool_size.grid(row=1, column=1, padx=8, pady=4, sticky='w')
+        self.entry_pool_size.insert(0, CONFIG.getint('General', 'connection_pool_size', fallback=2))
+        Label(frame_network,
+              text=_("Idle connection timeout (s)")).grid(row=2, column=0,
+                                                        padx=8, pady=4,
+                                                        sticky="e")
+        self.entry_idle_timeout = Entry(frame_network, width=10, justify='center',
+                                        validate='key',
+                                        validatecommand=(self._validate, '%P'))
+        self.entry_idle_timeout.grid(row=2, column=1, padx=8, pady=4, sticky='w')
+        self.entry_idle_timeout.insert(0, CONFIG.getint('General', 'connection_idle_timeout', fallback=60))
+        # --- timeouts
+        Label(frame_network,
+              text=_("Connection timeout (s)")).grid(row=3, column=0,
+                                                   padx=8, pady=4,
+                                                   sticky="e")
+        self.entry_connect_timeout = Entry(frame_network, width=10, justify='center',
+                                           validate='key',
+                                           validatecommand=(self._validate, '%P'))
+        self.entry_connect_timeout.grid(row=3, column=1, padx=8, pady=4, sticky='w')
+        self.entry_connect_timeout.insert(0, CONFIG.getint('General', 'connect_timeout', fallback=10))
+        Label(frame_network,
+              text=_("Download timeout (s)")).grid(row=4, column=0,
+                                                 padx=8, pady=4,
+                                                 sticky="e")
+        self.entry_read_timeout = Entry(frame_network, width=10, justify='center',
+                                        validate='key',
+                                        validatecommand=(self._validate, '%P'))
+        self.entry_read_timeout.grid(row=4, column=1, padx=8, pady=4, sticky='w')
+        self.entry_read_timeout.insert(0, CONFIG.getint('General', 'read_timeout', fallback=30))
+        # --- connectivity check
+        Label(frame_network,
+              text=_("Server used to check the Internet connection")).grid(row=5, column=0,
+                                                                         padx=8, pady=4,
+                                                                         sticky="e")
+        self.entry_connectivity_host = Entry(frame_network, width=20, justify='center')
+        self.entry_connectivity_host.grid(row=5, column=1, padx=8, pady=4, sticky='w')
+        self.entry_connectivity_host.insert(0, CONFIG.get('General', 'connectivity_host',
+                                                          fallback='www.google.com'))
+        # --- per server limits
+        Label(frame_network,
+              text=_("Maximum simultaneous downloads per server")).grid(row=6, column=0,
+                                                                       padx=8, pady=4,
+                                                                       sticky="e")
+        self.entry_host_connections = Entry(frame_network, width=10, justify='center',
+                                            validate='key',
+                                            validatecommand=(self._validate, '%P'))
+        self.entry_host_connections.grid(row=6, column=1, padx=8, pady=4, sticky='w')
+        self.entry_host_connections.insert(0, CONFIG.getint('General', 'host_max_connections',
+                                                            fallback=2))
+        Label(frame_network,
+              text=_("Minimum delay between two requests to a server (s)")).grid(row=7, column=0,
+                                                                                 padx=8, pady=4,
+                                                                                 sticky="e")
+        self.entry_host_spacing = Entry(frame_network, width=10, justify='center',
+                                        validate='key',
+                                        validatecommand=(self._validate, '%P'))
+        self.entry_host_spacing.grid(row=7, column=1, padx=8, pady=4, sticky='w')
+        self.entry_host_spacing.insert(0, '%g' % CONFIG.getfloat('General', 'host_min_spacing',
+                                                                 fallback=1))
+        # --- HTTP cache
+        Label(frame_network,
+              text=_("Size of the download cache (MB, 0 to disable it)")).grid(row=8, column=0,
+                                                                              padx=8, pady=4,
+                                                                              sticky="e")
+        self.entry_cache_size = Entry(frame_network, width=10, justify='center',
+                                      validate='key',
+                                      validatecommand=(self._validate, '%P'))
+        self.entry_cache_size.grid(row=8, column=1, padx=8, pady=4, sticky='w')
+        self.entry_cache_size.insert(0, CONFIG.getint('General', 'http_cache_size', fallback=50))
+
     def _init_widget(self):
         frame_widget = Frame(self)
         self.notebook.add(frame_widget, text=_('Widget'))
@@ -263,7 +411,24 @@ class Config(Toplevel):
         CONFIG.set("General", "language", REV_LANGUAGES[self.lang.get()])
         CONFIG.set("General", "trayicon", self.gui.get().lower())
         CONFIG.set("General", "update_delay", "%i" % (int(self.entry_delay.get()) * 60000))
+        CONFIG.set("General", "min_update_delay", "%i" % (int(self.entry_min_delay.get()) * 60000))
+        CONFIG.set("General", "max_update_delay", "%i" % (int(self.entry_max_delay.get()) * 60000))
+        CONFIG.set("General", "update_jitter", "%i" % min(50, int(self.entry_jitter.get())))
         CONFIG.set("General", "img_timeout", "%i" % (int(self.entry_timeout.get())))
+        CONFIG.set("General", "max_entries", "%i" % int(self.entry_max_entries.get()))
+        CONFIG.set("General", "max_entry_age", "%i" % int(self.entry_max_entry_age.get()))
+        CONFIG.set("General", "max_feed_size", "%i" % int(self.entry_max_feed_size.get()))
+        CONFIG.set("General", "fetch_workers", "%i" % max(1, int(self.entry_workers.get())))
+        CONFIG.set("General", "connection_pool_size", "%i" % int(self.entry_pool_size.get()))
+        CONFIG.set("General", "connection_idle_timeout", "%i" % max(1, int(self.entry_idle_timeout.get())))
+        CONFIG.set("General", "connect_timeout", "%i" % max(1, int(self.entry_connect_timeout.get())))
+        CONFIG.set("General", "read_timeout", "%i" % max(1, int(self.entry_read_timeout.get())))
+        CONFIG.set("General", "connectivity_host",
+                   self.entry_connectivity_host.get().strip() or 'www.google.com')
+        CONFIG.set("General", "host_max_connections",
+                   "%i" % max(1, int(self.entry_host_connections.get())))
+        CONFIG.set("General", "host_min_spacing", "%g" % float(self.entry_host_spacing.get()))
+        CONFIG.set("General", "http_cache_size", "%i" % int(self.entry_cache_size.get()))
         CONFIG.set('General', 'confirm_feed_remove', str(self.confirm_feed_rem.instate(('selected',))))
         CONFIG.set('General', 'confirm_cat_remove', str(self.confirm_cat_rem.instate(('selected',))))
         CONFIG.set('General', 'check_update', str(self.confirm_update.instate(('selected',))))
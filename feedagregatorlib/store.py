@@ -0,0 +1,390 @@
+#! /usr/bin/python3
+# -*- coding:Utf-8 -*-
+"""
+FeedAgregator - RSS and Atom feed agregator in desktop widgets + notifications
+Copyright 2018-2019 Juliette Monsel <j_4321@protonmail.com>
+
+FeedAgregator is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+FeedAgregator is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+SQLite store of the feed entries
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,   -- ids of removed feeds are never reused
+    name TEXT NOT NULL UNIQUE,          -- storage key, 'data' option of the feed
+    latest TEXT NOT NULL DEFAULT ''     -- html content for the latest entry
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,   -- increasing, see load
+    feed_id INTEGER NOT NULL REFERENCES feeds(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,          -- the most recently added entries have the highest position
+    title TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    link TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_feed ON entries(feed_id, position);
+CREATE INDEX IF NOT EXISTS entries_date ON entries(date);
+CREATE TABLE IF NOT EXISTS entry_keys (
+    feed_id INTEGER NOT NULL REFERENCES feeds(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    added INTEGER NOT NULL,             -- time at which the key was stored
+    PRIMARY KEY (feed_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entry_keys_added ON entry_keys(feed_id, added);
+"""
+
+NEW_FEED_NAME = 'entries{}'  # names of the new feeds, distinct from the legacy file names
+MAX_VARIABLES = 500     # maximum number of parameters in a query
+MAX_KEYS = 1000         # number of keys of seen entries kept per feed
+# the new entries are appended to the write-ahead log and copied into the
+# database by compact(), automatic checkpoints are only a safety net
+AUTOCHECKPOINT = 4000   # pages
+JOURNAL_SIZE_LIMIT = 4 * 1024 ** 2   # size (in bytes) of the log kept after a checkpoint
+
+
+class EntryStore:
+    """
+    Store of the feed entries in an SQLite database (WAL mode).
+
+    Each feed is identified by a storage key (the 'data' option in the
+    feeds config). The entries of a feed are kept in the order they were
+    added, the new ones first, together with the keys of all the entries
+    seen so far (see constants.entry_keys).
+
+    The feeds stored by older versions in pickle files in legacy_dir are
+    imported the first time they are accessed.
+
+    Each process opens its own connection so that the store can be used
+    by the fetch workers.
+
+    Adding entries only appends the new rows to the write-ahead log, the
+    existing entries are never rewritten. The log is merged into the
+    database by compact(), called by the main process after each update
+    cycle.
+    """
+
+    def __init__(self, path, legacy_dir=None):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        if self._pid != os.getpid():
+            # never reuse the connection of the parent process
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('PRAGMA wal_autocheckpoint=%i' % AUTOCHECKPOINT)
+            self._connection.execute('PRAGMA journal_size_limit=%i' % JOURNAL_SIZE_LIMIT)
+            self._connection.execute('PRAGMA foreign_keys=ON')
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._connection
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction."""
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+
+    def _feed_id(self, connection, name):
+        """
+        Return the id of the feed name.
+
+        If it is not in the database, the feed is imported from the legacy
+        pickle file if there is one. Raise KeyError if the feed does not
+        exist.
+        """
+        row = connection.execute('SELECT id FROM feeds WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        legacy = self._load_legacy(name)
+        if legacy is None:
+            raise KeyError(name)
+        feed_id = connection.execute('INSERT INTO feeds (name) VALUES (?)', (name,)).lastrowid
+        latest, entries, keys = legacy
+        self._insert(connection, feed_id, latest, entries, keys)
+        logging.info('Imported %s into the entry store', name)
+        return feed_id
+
+    def _load_legacy(self, name):
+        """Return (latest, entries, keys) stored in the legacy pickle file name, None if there is none."""
+        if self.legacy_dir is None:
+            return None
+        path = os.path.join(self.legacy_dir, name)
+        try:
+            with open(path, 'rb') as file:
+                pick = pickle.Unpickler(file)
+                latest = pick.load()
+                entries = pick.load()
+                try:
+                    keys = pick.load()
+                except EOFError:
+                    # file saved by an older version
+                    keys = None
+        except (FileNotFoundError, EOFError):
+            return None   # missing or reserved (empty) file
+        except (pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+            logging.exception('Corrupted data file %s', path)
+            return None
+        from feedagregatorlib.constants import entry_keys
+        from feedagregatorlib.dates import to_timestamp
+        converted = []
+        for title, date, summary, link in entries:
+            try:
+                date = to_timestamp(date)
+            except ValueError:
+                date = 0
+            converted.append((title, date, summary, link))
+        entries = converted
+        if keys is None:
+            keys = set(key for title, date, summary, link in entries
+                       for key in entry_keys(title, link))
+        return latest, entries, keys
+
+    @staticmethod
+    def _insert(connection, feed_id, latest, entries, keys):
+        """Insert entries (new ones first) and keys in the feed feed_id."""
+        position = connection.execute('SELECT MAX(position) FROM entries WHERE feed_id = ?',
+                                      (feed_id,)).fetchone()[0] or 0
+        nb = len(entries)
+        connection.executemany('INSERT INTO entries (feed_id, position, title, date, summary, link) '
+                               'VALUES (?, ?, ?, ?, ?, ?)',
+                               [(feed_id, position + nb - i) + tuple(entry)
+                                for i, entry in enumerate(entries)])
+        now = int(time.time())
+        connection.executemany('INSERT OR IGNORE INTO entry_keys (feed_id, key, added) '
+                               'VALUES (?, ?, ?)', [(feed_id, key, now) for key in keys])
+        connection.execute('UPDATE feeds SET latest = ? WHERE id = ?', (latest, feed_id))
+
+    def new_feed(self):
+        """
+        Create an empty feed and return its name.
+
+        The name is derived from the id of the feed in the database, so it
+        is allocated in constant time and is never given twice, even to
+        different processes.
+        """
+        with self._transaction() as connection:
+            feed_id = connection.execute('INSERT INTO feeds (name) VALUES (?)', ('',)).lastrowid
+            name = NEW_FEED_NAME.format(feed_id)
+            connection.execute('UPDATE feeds SET name = ? WHERE id = ?', (name, feed_id))
+        return name
+
+    def _read_feed_id(self, name):
+        """Return the id of the feed name, raise KeyError if it does not exist."""
+        row = self.connection.execute('SELECT id FROM feeds WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        # import the legacy file, if any
+        with self._transaction() as connection:
+            return self._feed_id(connection, name)
+
+    def load(self, name, limit=-1, ids=False, after_id=0):
+        """
+        Return (latest, entries) for the feed name.
+
+        entries: list of (title, date, summary, link), the most recently
+                 added first, at most limit entries if limit is not negative.
+                 If ids is True, the id of each entry is added first:
+                 (id, title, date, summary, link).
+        after_id: only return the entries added after the entry after_id
+                  (the ids of the entries increase)
+        """
+        feed_id = self._read_feed_id(name)
+        latest = self.connection.execute('SELECT latest FROM feeds WHERE id = ?',
+                                         (feed_id,)).fetchone()[0]
+        entries = self.connection.execute('SELECT %stitle, date, summary, link FROM entries '
+                                          'WHERE feed_id = ? AND id > ? ORDER BY position DESC LIMIT ?'
+                                          % ('id, ' if ids else ''),
+                                          (feed_id, after_id, limit)).fetchall()
+        return latest, entries
+
+    def latest(self, name):
+        """Return the html content for the latest entry of the feed name."""
+        feed_id = self._read_feed_id(name)
+        return self.connection.execute('SELECT latest FROM feeds WHERE id = ?',
+                                       (feed_id,)).fetchone()[0]
+
+    def latests(self, names):
+        """
+        Return {name: html content for the latest entry} for the feeds in names.
+
+        The feeds already in the database are read with a single query,
+        the missing ones are imported from the legacy files or skipped.
+        """
+        names = set(names)
+        latests = {name: latest for name, latest in
+                   self.connection.execute('SELECT name, latest FROM feeds') if name in names}
+        for name in names.difference(latests):
+            try:
+                latests[name] = self.latest(name)
+            except KeyError:
+                pass
+        return latests
+
+    def add_entries(self, name, latest, entries, keys, retention=None):
+        """
+        Add the entries not seen yet to the feed name.
+
+        latest: html content for the latest entry
+        entries: list of (title, date, summary, link)
+        keys: list of the keys identifying each entry (see entry_keys)
+        retention: (max_entries, max_age, max_size), if not None, the
+                   entries exceeding the limits are removed (see prune)
+
+        The new entries are put first. Return the number of new entries and
+        the list of the ids of the removed entries. Raise KeyError if the
+        feed does not exist (see new_feed).
+        """
+        # do not add the entries that would be removed right away
+        min_date = time.time() - retention[1] if retention is not None and retention[1] else 0
+        all_keys = list(set(key for entry_key_list in keys for key in entry_key_list))
+        with self._transaction() as connection:
+            stored = connection.execute('SELECT latest FROM feeds WHERE name = ?', (name,)).fetchone()
+            feed_id = self._feed_id(connection, name)
+            seen = set()
+            for i in range(0, len(all_keys), MAX_VARIABLES):
+                chunk = all_keys[i:i + MAX_VARIABLES]
+                seen.update(row[0] for row in connection.execute(
+                    'SELECT key FROM entry_keys WHERE feed_id = ? AND key IN (%s)'
+                    % ','.join('?' * len(chunk)), [feed_id] + chunk))
+            new_entries = []
+            new_keys = set()
+            for entry, entry_key_list in zip(entries, keys):
+                if (seen.isdisjoint(entry_key_list) and new_keys.isdisjoint(entry_key_list)
+                        and entry[1] >= min_date):
+                    new_entries.append(entry)
+                new_keys.update(entry_key_list)
+            if new_entries or not (stored and stored[0]):
+                # also set the latest entry of new feeds
+                self._insert(connection, feed_id, latest, new_entries, new_keys)
+            pruned = [] if retention is None else self._prune(connection, feed_id, *retention)
+            self._prune_keys(connection, feed_id, all_keys)
+        return len(new_entries), pruned
+
+    @staticmethod
+    def _prune_keys(connection, feed_id, current):
+        """
+        Forget the oldest keys of feed_id when there are more than MAX_KEYS.
+
+        The keys in current (those of the entries of the last fetched
+        version of the feed) are kept so that these entries are not added
+        again.
+        """
+        nb = connection.execute('SELECT COUNT(*) FROM entry_keys WHERE feed_id = ?',
+                                (feed_id,)).fetchone()[0]
+        if nb <= MAX_KEYS:
+            return
+        current = set(current)
+        # remove a few more keys so that this is not done at each update
+        old = [(feed_id, key) for key, in connection.execute(
+            'SELECT key FROM entry_keys WHERE feed_id = ? ORDER BY added', (feed_id,)).fetchall()
+            if key not in current][:nb - int(0.9 * MAX_KEYS)]
+        connection.executemany('DELETE FROM entry_keys WHERE feed_id = ? AND key = ?', old)
+
+    @staticmethod
+    def _prune(connection, feed_id, max_entries=0, max_age=0, max_size=0):
+        """Remove the entries of feed_id exceeding the limits (see prune), return their ids."""
+        pruned = []
+        if max_age:
+            pruned.extend(row[0] for row in connection.execute(
+                'SELECT id FROM entries WHERE feed_id = ? AND date < ?',
+                (feed_id, time.time() - max_age)))
+        if max_entries or max_size:
+            nb = 0
+            size = 0
+            old = set(pruned)
+            # only the most recent entries are kept
+            for entry_id, entry_size in connection.execute(
+                    'SELECT id, LENGTH(CAST(title AS BLOB)) + LENGTH(CAST(summary AS BLOB)) '
+                    '+ LENGTH(CAST(link AS BLOB)) FROM entries WHERE feed_id = ? '
+                    'ORDER BY position DESC', (feed_id,)):
+                if entry_id in old:
+                    continue
+                nb += 1
+                size += entry_size
+                if (max_entries and nb > max_entries) or (max_size and size > max_size):
+                    pruned.append(entry_id)
+        for i in range(0, len(pruned), MAX_VARIABLES):
+            chunk = pruned[i:i + MAX_VARIABLES]
+            connection.execute('DELETE FROM entries WHERE id IN (%s)' % ','.join('?' * len(chunk)),
+                               chunk)
+        return pruned
+
+    def prune(self, name, max_entries=0, max_age=0, max_size=0):
+        """
+        Remove the entries of the feed name exceeding the limits.
+
+        max_entries: maximum number of entries, the oldest ones are removed
+        max_age: maximum age (in seconds) of the entries
+        max_size: maximum total size (in bytes) of the entries
+
+        0 means no limit. The keys of the removed entries are kept so that
+        they are not added again. Return the list of the ids of the removed
+        entries.
+        """
+        with self._transaction() as connection:
+            return self._prune(connection, self._feed_id(connection, name), max_entries,
+                               max_age, max_size)
+
+    def remove(self, name):
+        """Remove the feed name."""
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM feeds WHERE name = ?', (name,))
+        if self.legacy_dir is not None:
+            try:
+                os.remove(os.path.join(self.legacy_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def remove_unused(self, names):
+        """Remove the feeds not in names, return their number."""
+        names = set(names)
+        with self._transaction() as connection:
+            unused = [(feed_id,) for feed_id, name in
+                      connection.execute('SELECT id, name FROM feeds') if name not in names]
+            connection.executemany('DELETE FROM feeds WHERE id = ?', unused)
+        return len(unused)
+
+    def compact(self):
+        """
+        Copy the content of the write-ahead log into the database.
+
+        The checkpoint does not wait for the other connections: return
+        False if it could not be completed because of concurrent readers
+        or writers, it will be completed by the next call.
+        """
+        busy, log, checkpointed = self.connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        logging.debug('Entry store checkpoint: %i/%i pages', checkpointed, log)
+        return not busy and checkpointed == log
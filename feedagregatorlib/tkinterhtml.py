@@ -29,15 +29,28 @@ import warnings
 import logging
 import tkinter as tk
 from tkinter import ttk
-from urllib.request import urlopen
 from webbrowser import open as webOpen
 
 from PIL.ImageTk import PhotoImage
 
-from .constants import IM_IMG_MISSING, CONFIG
+from .constants import IM_IMG_MISSING, CONFIG, PATH_CACHE
+from .http_cache import HTTPCache, cached_urlopen
 
 
 _tkhtml_loaded = False
+_image_cache = None
+
+
+def image_cache():
+    """Return the HTTP cache used for the images (None if the cache is disabled)."""
+    global _image_cache
+    size = CONFIG.getint("General", "http_cache_size", fallback=50) * 1024 ** 2
+    if not size:
+        return None
+    if _image_cache is None:
+        _image_cache = HTTPCache(PATH_CACHE, size)
+    _image_cache.max_size = size
+    return _image_cache
 
 
 def load_tkhtml(master, location=None):
@@ -177,8 +190,8 @@ class TkinterHtml(tk.Widget):
         url = args[0]
         name = self._image_name_prefix + str(len(self._images))
         try:
-            with urlopen(url, timeout=CONFIG.getint("General", "img_timeout", fallback=10)) as handle:
-                data = handle.read()
+            data = cached_urlopen(url, image_cache(),
+                                  timeout=CONFIG.getint("General", "img_timeout", fallback=10))
         except Exception as e:
             logging.error('Error: %s\nurl=%s', str(e), url)
             name = self._image_name_prefix + 'missing'
@@ -20,17 +20,15 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Base desktop widget
 """
-from datetime import datetime
-from locale import getlocale
 from webbrowser import open as webopen
 from tkinter import Toplevel, BooleanVar, Menu, StringVar, Canvas, TclError
 from tkinter.ttk import Style, Label, Separator, Sizegrip, Frame, Button
 from tkinter.font import Font
 
 from ewmh import EWMH, ewmh
-from babel.dates import format_datetime
 
 from feedagregatorlib.constants import CONFIG, APP_NAME, add_trace
+from feedagregatorlib.dates import format_date
 from feedagregatorlib.autoscrollbar import AutoScrollbar
 from feedagregatorlib.toggledframe import ToggledFrame
 from feedagregatorlib.tkinterhtml import HtmlFrame
@@ -181,11 +179,7 @@ class BaseWidget(Toplevel):
                     pass
                 else:
                     l.configure(height=h + 2)
-        # convert date to locale time
-        formatted_date = format_datetime(datetime.strptime(date, '%Y-%m-%d %H:%M').astimezone(tz=None),
-                                         'short', locale=getlocale()[0])
-
-        tf = ToggledFrame(self.display, text="{} - {}".format(title, formatted_date),
+        tf = ToggledFrame(self.display, text="{} - {}".format(title, format_date(date)),
                           style='widget.TFrame')
         l = HtmlFrame(tf.interior, height=50, style='widget.interior.TFrame')
         l.set_content(summary)
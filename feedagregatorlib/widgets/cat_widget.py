@@ -20,16 +20,10 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 Desktop category widget
 """
-import configparser
-import pickle
-from datetime import datetime
-from locale import getlocale
 from tkinter import StringVar, TclError
 
-from babel.dates import format_datetime
-
-from feedagregatorlib.constants import CONFIG, FEEDS, LATESTS, add_trace, \
-    feed_get_latest, save_latests
+from feedagregatorlib.constants import CONFIG, FEEDS, LATESTS, add_trace, save_latests
+from feedagregatorlib.dates import format_date, to_timestamp
 from feedagregatorlib.messagebox import askokcancel
 from .base_widget import BaseWidget
 
@@ -70,11 +64,7 @@ class CatWidget(BaseWidget):
         self.entries.clear()
         for title in sorted(FEEDS.sections(), key=lambda x: x.lower()):
             if self.name in ['All', FEEDS.get(title, 'category', fallback='')]:
-                try:
-                    filename = FEEDS.get(title, 'data')
-                    latest = feed_get_latest(filename)
-                except (configparser.NoOptionError, pickle.UnpicklingError):
-                    latest = ''
+                latest = self.master.latests.get(title, '')
                 url = FEEDS.get(title, 'url')
                 date = FEEDS.get(title, 'updated')
                 self.entry_add(title, date, latest, url)
@@ -122,10 +112,8 @@ class CatWidget(BaseWidget):
         self.entries[new_name][0].label.configure(text=old_title.replace(old_name, new_name))
 
     def update_display(self, title, latest, date):
-        formatted_date = format_datetime(datetime.strptime(date, '%Y-%m-%d %H:%M').astimezone(tz=None),
-                                         'short', locale=getlocale()[0])
         tf, l = self.entries[title]
-        tf.label.configure(text="{} - {}".format(title, formatted_date))
+        tf.label.configure(text="{} - {}".format(title, format_date(date)))
         l.set_content(latest)
         l.set_style(self._stylesheet)
         l.update_idletasks()
@@ -162,6 +150,6 @@ class CatWidget(BaseWidget):
         save_latests()
 
     def _sort_by_date(self, reverse):
-        titles = sorted(self.entries, reverse=reverse, key=lambda x: FEEDS.get(x, 'updated'))
+        titles = sorted(self.entries, reverse=reverse, key=lambda x: to_timestamp(FEEDS.get(x, 'updated')))
         for i, title in enumerate(titles):
             self.entries[title][0].grid_configure(row=i)
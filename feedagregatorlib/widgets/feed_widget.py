@@ -21,7 +21,6 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 Desktop widget for a single feed
 """
 import configparser
-import pickle
 from tkinter import BooleanVar
 from tkinter.ttk import Entry
 
@@ -33,6 +32,8 @@ from .base_widget import BaseWidget
 class FeedWidget(BaseWidget):
     def __init__(self, master, feed_name):
         self.entries = []
+        self._entry_ids = {}    # {entry id in the entry store: displayed entry}
+        self.last_entry_id = 0  # id of the most recently added entry displayed
         BaseWidget.__init__(self, master, feed_name, FEEDS, save_feeds)
         self.label.bind('<Double-1>', self.rename)
 
@@ -58,11 +59,11 @@ class FeedWidget(BaseWidget):
     def populate_widget(self):
         try:
             filename = FEEDS.get(self.name, 'data')
-            latest, data = load_data(filename)
-        except (configparser.NoOptionError, pickle.UnpicklingError):
+            latest, data = load_data(filename, ids=True)
+        except (configparser.NoOptionError, KeyError):
             data = []
-        for entry_title, date, summary, link in data:
-            self.entry_add(entry_title, date, summary, link, -1)
+        for entry_id, entry_title, date, summary, link in data:
+            self.entry_add(entry_title, date, summary, link, -1, entry_id)
         self.sort_by_date()
 
     def remove_feed(self):
@@ -89,14 +90,30 @@ class FeedWidget(BaseWidget):
         for tf, l in self.entries:
             tf.destroy()
         self.entries.clear()
+        self._entry_ids.clear()
 
-    def entry_add(self, title, date, summary, url, index=0):
-        """Display entry."""
+    def entry_add(self, title, date, summary, url, index=0, entry_id=None):
+        """Display entry, entry_id is its id in the entry store."""
         tf, l = BaseWidget.entry_add(self, title, date, summary, url)
         if index == -1:
             self.entries.append((tf, l))
         else:
             self.entries.insert(index, (tf, l))
+        if entry_id is not None:
+            self._entry_ids[entry_id] = (tf, l)
+            self.last_entry_id = max(self.last_entry_id, entry_id)
+
+    def entries_remove(self, entry_ids):
+        """Remove the entries removed from the entry store."""
+        removed = [self._entry_ids.pop(entry_id) for entry_id in entry_ids
+                   if entry_id in self._entry_ids]
+        if not removed:
+            return
+        for tf, l in removed:
+            tf.destroy()
+        removed = set(removed)
+        self.entries = [entry for entry in self.entries if entry not in removed]
+        self.sort_by_date()
 
     def rename(self, event):
 